@@ -0,0 +1,71 @@
+"""
+Compares the structured memory-mapped CKTable reader against the
+previous int32 striding reader on a synthetic k-table folder::
+
+    python benchmarks/bench_ck_reader.py --wavenumbers 5000 --workers 4
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+
+from synthetic import make_ktable_folder
+
+
+def legacy_read_sigma(sigma):
+    """The reader used before the structured Fortran record dtype."""
+    read_array = np.fromfile(sigma, dtype=np.int32)
+
+    first_half = read_array[1::4]
+    second_half = read_array[2::4]
+
+    combined = np.empty(shape=(len(first_half)*2), dtype=np.int32)
+
+    combined[0::2] = first_half
+    combined[1::2] = second_half
+
+    return combined.view(np.float64).reshape(-1, 16)
+
+
+def best_of(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--wavenumbers', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    from taurex.cache import GlobalCache
+    from taurex_petitrad.opacities.ck import CKTable
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = make_ktable_folder(tmp, n_wavenumbers=args.wavenumbers)
+        GlobalCache()['petitrad_load_workers'] = 1
+        table = CKTable(folder)
+        nbytes = table.xsecGrid.nbytes
+
+        structured_read_sigma = table._read_sigma
+        table._read_sigma = legacy_read_sigma
+        results = [('legacy', best_of(table._load_xsec, args.repeats))]
+        table._read_sigma = structured_read_sigma
+
+        for workers in sorted({1, args.workers}):
+            GlobalCache()['petitrad_load_workers'] = workers
+            results.append(('structured x{}'.format(workers),
+                            best_of(table._load_xsec, args.repeats)))
+
+        print('{} files, {:.1f} MB'.format(len(table._sigma_files), nbytes/1e6))
+        for name, elapsed in results:
+            print('{:<16} {:8.3f} s {:8.1f} MB/s'.format(name, elapsed, nbytes/1e6/elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Import time of the plugin in fresh interpreters, as paid by every
+TauREx process that loads the ``taurex.plugins`` entry point::
+
+    python benchmarks/bench_import.py --repeats 10
+
+``plugin`` only imports the package, as a worker or a script using
+the utility modules does. ``classes`` also resolves every class, which
+is what the eager ``__init__`` did. ``factory`` registers the plugin
+with the TauREx class factory, as every TauREx run does. Times are
+relative to importing ``taurex`` and its models alone (and creating the
+class factory for ``factory``).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import numpy as np
+
+FACTORY = 'from taurex.parameter.classfactory import ClassFactory\nClassFactory()'
+
+SCENARIOS = {
+    'taurex': ('', ''),
+    'plugin': ('', 'import taurex_petitrad'),
+    'classes': ('', 'import taurex_petitrad\n'
+                    'for name in taurex_petitrad.__all__:\n'
+                    '    getattr(taurex_petitrad, name)'),
+    'factory': (FACTORY, 'import taurex_petitrad\n'
+                         'ClassFactory().load_plugin(taurex_petitrad)'),
+}
+
+TEMPLATE = """
+import time
+start = time.perf_counter()
+import taurex.model
+import taurex.opacity
+{}
+base = time.perf_counter()
+{}
+end = time.perf_counter()
+print(base - start, end - base)
+"""
+
+
+def time_scenario(setup, code, repeats):
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(x for x in (root, env.get('PYTHONPATH')) if x)
+    results = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', TEMPLATE.format(setup, code)], env=env,
+                                check=True, capture_output=True, text=True).stdout
+        results.append([float(x) for x in output.split()[-2:]])
+    return np.median(np.array(results), axis=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, (setup, code) in SCENARIOS.items():
+        base, extra = time_scenario(setup, code, args.repeats)
+        print('{:<10} taurex {:8.1f} ms  plugin {:8.2f} ms'.format(name, base*1e3, extra*1e3))
+
+
+if __name__ == '__main__':
+    main()
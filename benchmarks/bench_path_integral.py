@@ -0,0 +1,90 @@
+"""
+Times ``DirectImageRADTRANS.path_integral`` against the implementation
+that converted units with astropy and allocated its output arrays on
+every call. Uses the stand-in petitRADTRANS from ``standin/``::
+
+    python benchmarks/bench_path_integral.py --calls 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+from synthetic import make_linebyline_folder
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'standin'))
+
+
+def legacy_path_integral(model, wngrid):
+    """The direct imaging path integral before the cached conversion."""
+    import astropy.units as u
+    abundances, temperature, MMW, Rp, gravity, p0bar = model.setup_parameters()
+    model.atmosphere.calc_flux(temperature, abundances, gravity, MMW)
+
+    flux = model.atmosphere.flux[::-1] * u.erg / u.cm**2 / u.s / u.Hz
+    native = model.nativeWavenumberGrid
+    native_filt = (native >= wngrid.min()) & (native <= wngrid.max())
+    flux = flux.to(u.W/u.m**2/u.um, equivalencies=u.spectral_density(native*u.k))
+    flux = flux[native_filt].value
+    if np.any(np.isnan(flux)):
+        raise ValueError('NaN in flux')
+    return flux, np.zeros(shape=(model.nLayers, wngrid.shape[0]))
+
+
+def build_model(input_data, nlayers, wlen):
+    from taurex.cache import GlobalCache, OpacityCache
+    from taurex.data.profiles.chemistry import TaurexChemistry, ConstantGas
+    from taurex.data.profiles.temperature import Isothermal
+    from taurex_petitrad.model.directimage import DirectImageRADTRANS
+
+    make_linebyline_folder(input_data, 'H2O', n_wavenumbers=100)
+    GlobalCache()['xsec_path'] = input_data
+
+    if hasattr(OpacityCache(), 'force_active'):
+        OpacityCache().force_active(['H2O'])
+    chemistry = TaurexChemistry()
+    chemistry.addGas(ConstantGas('H2O', 1e-4))
+
+    model = DirectImageRADTRANS(temperature_profile=Isothermal(1200.0),
+                                chemistry=chemistry, nlayers=nlayers,
+                                wlen_bords_micron=wlen)
+    model.build()
+    model.initialize_profiles()
+    return model
+
+
+def per_call(func, calls):
+    func()
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start)/calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--nlayers', type=int, default=100)
+    parser.add_argument('--wlen', type=float, nargs=2, default=[0.3, 15.0])
+    args = parser.parse_args()
+
+    input_data = tempfile.mkdtemp()
+    model = build_model(input_data, args.nlayers, args.wlen)
+    native = model.nativeWavenumberGrid
+    wngrid = np.linspace(native[0], native[-1], 200)
+
+    new, _ = model.path_integral(wngrid, False)
+    old, _ = legacy_path_integral(model, wngrid)
+    print('Native points {}, max relative difference {:.2e}'.format(
+        native.shape[0], np.abs(new/old - 1).max()))
+
+    legacy = per_call(lambda: legacy_path_integral(model, wngrid), args.calls)
+    current = per_call(lambda: model.path_integral(wngrid, False), args.calls)
+    print('legacy  {:8.1f} us/call'.format(legacy*1e6))
+    print('current {:8.1f} us/call  ({:.2f}x)'.format(current*1e6, legacy/current))
+
+
+if __name__ == '__main__':
+    main()
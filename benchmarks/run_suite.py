@@ -0,0 +1,185 @@
+"""
+Benchmark suite of the opacity loaders and forward models on a
+synthetic petitRADTRANS database and the stand-in Radtrans from
+``standin/``, no real data or network access is needed::
+
+    python benchmarks/run_suite.py --molecules H2O CO CH4 --json results.json
+
+Each benchmark reports the best time of ``--repeats`` runs, a throughput
+and the peak memory allocated while it ran (tracemalloc). Results can be
+written to JSON to track regressions.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'standin'))
+
+from synthetic import make_input_data
+
+
+def measure(func, repeats):
+    """Best wall time of ``repeats`` calls and the peak traced memory in bytes"""
+    timings = []
+    tracemalloc.start()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak
+
+
+class Suite:
+
+    def __init__(self, repeats):
+        self.repeats = repeats
+        self.results = []
+
+    def run(self, name, func, amount=None, unit=None):
+        elapsed, peak = measure(func, self.repeats)
+        result = {'name': name, 'seconds': elapsed, 'peak_bytes': peak}
+        if amount is not None:
+            result['throughput'] = amount/elapsed
+            result['unit'] = unit
+        self.results.append(result)
+
+        throughput = ''
+        if amount is not None:
+            throughput = '{:12.1f} {}'.format(result['throughput'], unit)
+        print('{:<36} {:10.2f} ms {:>22} {:10.1f} MB'.format(
+            name, elapsed*1e3, throughput, peak/1e6))
+        return result
+
+
+def discovery_benchmarks(suite, input_data):
+    from taurex_petitrad.opacities.linebyline import LineByLine
+    from taurex_petitrad.opacities.ck import CKTable
+    from taurex_petitrad.util import index
+
+    def cold(klass, folder):
+        def discover():
+            index._indexes.clear()
+            index_file = os.path.join(input_data, 'opacities', 'lines', folder, index.INDEX_NAME)
+            if os.path.exists(index_file):
+                os.remove(index_file)
+            klass.discover()
+        return discover
+
+    suite.run('LineByLine.discover (cold)', cold(LineByLine, 'line_by_line'))
+    suite.run('LineByLine.discover (indexed)', LineByLine.discover)
+    suite.run('CKTable.discover (cold)', cold(CKTable, 'corr_k'))
+    suite.run('CKTable.discover (indexed)', CKTable.discover)
+
+
+def opacity_benchmarks(suite, molecules, nlayers):
+    from taurex_petitrad.opacities.linebyline import LineByLine
+    from taurex_petitrad.opacities.ck import CKTable
+    from taurex_petitrad.opacities.multiopacity import MultiOpacity
+
+    rng = np.random.default_rng(0)
+    loaded = {}
+    for klass, load in ((LineByLine, '_load_xsec_from_path'), (CKTable, '_load_xsec')):
+        for molecule, path in klass.discover():
+            if molecule not in molecules:
+                continue
+            opacity = klass(path)
+            label = '{} {}'.format(klass.__name__, molecule)
+            nfiles = len(opacity._sigma_files)
+
+            suite.run('{} _determine_grids'.format(label), opacity._determine_grids,
+                      nfiles, 'files/s')
+            suite.run('{} {}'.format(label, load), getattr(opacity, load),
+                      opacity.xsecGrid.nbytes/1e6, 'MB/s')
+
+            temperature = rng.uniform(opacity.temperatureGrid.min(),
+                                      opacity.temperatureGrid.max(), nlayers)
+            pressure = 10**rng.uniform(np.log10(opacity.pressureGrid.min()),
+                                       np.log10(opacity.pressureGrid.max()), nlayers)
+
+            def interpolate():
+                for t, p in zip(temperature, pressure):
+                    opacity.compute_opacity(t, p)
+
+            suite.run('{} compute_opacity'.format(label), interpolate, nlayers, 'layers/s')
+            loaded.setdefault(klass.__name__, []).append(opacity)
+
+        opacities = loaded.get(klass.__name__, [])
+        if len(opacities) > 0:
+            engine = MultiOpacity(opacities)
+            suite.run('{} MultiOpacity x{}'.format(klass.__name__, len(opacities)),
+                      lambda: engine.compute_opacities(temperature, pressure),
+                      nlayers*len(opacities), 'layers/s')
+
+
+def model_benchmarks(suite, molecules, nlayers, calls):
+    from taurex.cache import OpacityCache
+    from taurex.data.profiles.chemistry import TaurexChemistry, ConstantGas
+    from taurex.data.profiles.temperature import Isothermal
+    from taurex_petitrad.model.transmission import TransmissionRADTRANS
+    from taurex_petitrad.model.emission import EmissionRADTRANS
+    from taurex_petitrad.model.directimage import DirectImageRADTRANS
+
+    if hasattr(OpacityCache(), 'force_active'):
+        OpacityCache().force_active(list(molecules))
+
+    for klass in (TransmissionRADTRANS, EmissionRADTRANS, DirectImageRADTRANS):
+        chemistry = TaurexChemistry()
+        for molecule in molecules:
+            chemistry.addGas(ConstantGas(molecule, 1e-4))
+        model = klass(temperature_profile=Isothermal(1200.0), chemistry=chemistry,
+                      nlayers=nlayers, opacity_method='xsec')
+        model.build()
+        native_grid, _, _, _ = model.model()
+
+        def evaluate():
+            for _ in range(calls):
+                model.path_integral(native_grid, False)
+
+        suite.run('{} path_integral'.format(klass.__name__), evaluate, calls, 'spectra/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--molecules', nargs='+', default=['H2O', 'CO', 'CH4'])
+    parser.add_argument('--lbl-wavenumbers', type=int, default=100000)
+    parser.add_argument('--ck-wavenumbers', type=int, default=1000)
+    parser.add_argument('--nlayers', type=int, default=100)
+    parser.add_argument('--calls', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    from taurex.cache import GlobalCache
+
+    suite = Suite(args.repeats)
+    with tempfile.TemporaryDirectory() as input_data:
+        make_input_data(input_data, args.molecules, args.lbl_wavenumbers, args.ck_wavenumbers)
+        GlobalCache()['xsec_path'] = input_data
+        GlobalCache()['ktable_path'] = input_data
+        GlobalCache()['petitrad_cache_path'] = None
+
+        discovery_benchmarks(suite, input_data)
+        opacity_benchmarks(suite, args.molecules, args.nlayers)
+        model_benchmarks(suite, args.molecules, args.nlayers, args.calls)
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+    print('Peak resident memory {:.1f} MB'.format(max_rss/1e6))
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump({'arguments': vars(args), 'max_rss_bytes': max_rss,
+                       'results': suite.results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
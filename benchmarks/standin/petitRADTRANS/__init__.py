@@ -0,0 +1,62 @@
+"""
+Minimal stand-in for the petitRADTRANS ``Radtrans`` class so that the
+plugin can be benchmarked without petitRADTRANS or its opacities. The
+radiative transfer is replaced by cheap array arithmetic with the same
+stages (opacity interpolation, mixing, radius or flux) and array shapes,
+timings therefore measure the plugin overhead only.
+"""
+import numpy as np
+from . import nat_cst
+
+GRID_RANGE = (0.1, 251.0)
+
+
+class Radtrans:
+
+    def __init__(self, line_species=[], rayleigh_species=[], continuum_opacities=[],
+                 wlen_bords_micron=[0.3, 15], mode='c-k', resolution=1000):
+        self.line_species = list(line_species)
+        self.mode = mode
+        # Like petitRADTRANS, the wavelengths are taken from one fixed grid
+        # so that objects of adjacent ranges share their points
+        full = GRID_RANGE[0]*np.exp(np.arange(int(np.log(GRID_RANGE[1]/GRID_RANGE[0])*resolution))/resolution)
+        keep = (full >= wlen_bords_micron[0]) & (full <= wlen_bords_micron[1])
+        self.freq = nat_cst.c/(full[keep]*1e-4)
+        self._species_opacity = np.geomspace(1e-2, 1e2, full.shape[0])[keep, None] * \
+            np.arange(1, len(self.line_species) + 1)[None, :]
+
+    def setup_opa_structure(self, press):
+        self.press = press*1e6
+
+    def interpolate_species_opa(self, temp):
+        self.temp = temp
+        scale = np.sqrt(temp/1000.0)
+        self.line_struc_kappas = self._species_opacity[:, None, :]*scale[None, :, None]
+
+    def mix_opa_tot(self, abundances, mmw, gravity, sigma_lnorm=None, fsed=None,
+                    Kzz=None, radius=None, add_cloud_scat_as_abs=None, **kwargs):
+        mass_fractions = np.stack([abundances[x] for x in self.line_species], axis=-1)
+        self.continuum_opa = (self.line_struc_kappas*mass_fractions[None]).sum(axis=-1)
+
+    def calc_transm_rad(self, P0_bar, R_pl, gravity, mmw, Pcloud=None,
+                        gamma_scat=None, kappa_zero=None, haze_factor=None):
+        opacity = self.continuum_opa
+        if haze_factor is not None:
+            opacity = opacity*(1 + haze_factor)
+        if kappa_zero is not None:
+            opacity = opacity + kappa_zero*(self.freq[:, None]/1e14)**(gamma_scat or -4.0)
+        if Pcloud is not None:
+            opacity = np.where(self.press[None, :] > Pcloud*1e6, 1e10, opacity)
+        self.transm_rad = R_pl*(1 + 1e-3*np.log1p(opacity.mean(axis=-1))) + 1e3*P0_bar
+
+    def calc_transm(self, temp, abunds, gravity, mmw, R_pl=None, P0_bar=None, Pcloud=None,
+                    gamma_scat=None, kappa_zero=None, haze_factor=None, **kwargs):
+        self.interpolate_species_opa(temp)
+        self.mix_opa_tot(abunds, mmw, gravity)
+        self.calc_transm_rad(P0_bar, R_pl, gravity, mmw, Pcloud, gamma_scat, kappa_zero, haze_factor)
+
+    def calc_flux(self, temp, abunds, gravity, mmw, **kwargs):
+        self.interpolate_species_opa(temp)
+        self.mix_opa_tot(abunds, mmw, gravity)
+        self.flux = 1e-5*(self.freq/1e14)**2*(1 + np.log1p(self.continuum_opa.mean(axis=-1))) * \
+            self.temp.mean()/1000.0
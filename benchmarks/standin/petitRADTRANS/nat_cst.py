@@ -0,0 +1,2 @@
+c = 2.99792458e10
+r_jup_mean = 6.9911e9
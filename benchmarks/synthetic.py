@@ -0,0 +1,85 @@
+"""
+Generates synthetic petitRADTRANS opacity folders with the same file
+naming and binary layout as the real ``input_data`` so the loaders can
+be benchmarked without the real database.
+"""
+import os
+import numpy as np
+
+FORTRAN_RECORD = np.dtype([('head', np.int32), ('value', np.float64), ('tail', np.int32)])
+
+DEFAULT_TEMPERATURES = (81.14113604736988, 109.60677358237457, 148.05862230132453,
+                        200.0, 270.163273706, 364.940972297, 492.968238926,
+                        665.909566201, 899.521542576, 1215.08842295,
+                        1641.36133001, 2217.17775497, 2995.0)
+
+DEFAULT_PRESSURES = tuple(10.0**np.arange(-6, 3))
+
+
+def sigma_name(temperature, pressure):
+    """petitRADTRANS sigma file name, pressure in bar."""
+    return 'sigma_05_{}K_{:.6f}bar.dat'.format(temperature, pressure)
+
+
+def make_ktable_folder(input_data, molecule='H2O', n_wavenumbers=1000,
+                       temperatures=DEFAULT_TEMPERATURES,
+                       pressures=DEFAULT_PRESSURES, seed=0):
+    """
+    Writes a ``opacities/lines/corr_k/<molecule>_main_iso`` folder
+    with Fortran sequential sigma files of 16 g-points.
+    """
+    from taurex.constants import SPDLIGT
+    folder = os.path.join(input_data, 'opacities', 'lines', 'corr_k',
+                          '{}_main_iso'.format(molecule))
+    os.makedirs(folder, exist_ok=True)
+
+    wavelength = np.geomspace(0.3e-6, 28e-6, n_wavenumbers)
+    frequency = SPDLIGT/wavelength
+    np.savetxt(os.path.join(folder, 'kappa_g_info.dat'),
+               np.stack([frequency, np.zeros_like(frequency)], axis=1),
+               header='freq', comments='# ')
+
+    rng = np.random.default_rng(seed)
+    records = np.empty(n_wavenumbers*16, dtype=FORTRAN_RECORD)
+    records['head'] = FORTRAN_RECORD['value'].itemsize
+    records['tail'] = FORTRAN_RECORD['value'].itemsize
+    for t in temperatures:
+        for p in pressures:
+            records['value'] = 10**rng.uniform(-5, 3, records.shape[0])
+            records.tofile(os.path.join(folder, sigma_name(t, p)))
+    return folder
+
+
+def make_linebyline_folder(input_data, molecule='H2O', n_wavenumbers=100000,
+                           temperatures=DEFAULT_TEMPERATURES,
+                           pressures=DEFAULT_PRESSURES, seed=0):
+    """
+    Writes a ``opacities/lines/line_by_line/<molecule>_main_iso`` folder
+    with a ``wlen.dat`` in cm and raw float64 sigma files.
+    """
+    folder = os.path.join(input_data, 'opacities', 'lines', 'line_by_line',
+                          '{}_main_iso'.format(molecule))
+    os.makedirs(folder, exist_ok=True)
+
+    np.geomspace(0.3e-4, 28e-4, n_wavenumbers).tofile(os.path.join(folder, 'wlen.dat'))
+
+    rng = np.random.default_rng(seed)
+    for t in temperatures:
+        for p in pressures:
+            (10**rng.uniform(-5, 3, n_wavenumbers)).tofile(os.path.join(folder, sigma_name(t, p)))
+    return folder
+
+
+def make_input_data(input_data, molecules=('H2O', 'CO', 'CH4'), lbl_wavenumbers=100000,
+                    ck_wavenumbers=1000, temperatures=DEFAULT_TEMPERATURES,
+                    pressures=DEFAULT_PRESSURES):
+    """
+    Writes a petitRADTRANS ``input_data`` tree with both line-by-line
+    and correlated-k folders for every molecule.
+    """
+    for seed, molecule in enumerate(molecules):
+        make_linebyline_folder(input_data, molecule, lbl_wavenumbers,
+                               temperatures, pressures, seed)
+        make_ktable_folder(input_data, molecule, ck_wavenumbers,
+                           temperatures, pressures, seed)
+    return input_data
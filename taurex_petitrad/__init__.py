@@ -1,5 +1,28 @@
-from .opacities.linebyline import LineByLine
-from .opacities.ck import CKTable
-from .model.transmission import TransmissionRADTRANS
-from .model.directimage import DirectImageRADTRANS
-from .model.emission import EmissionRADTRANS
\ No newline at end of file
+"""
+Classes are imported on first access so that importing the plugin,
+for example from a worker process or through one of the utility
+modules, does not load the models and opacity readers.
+"""
+import importlib
+
+_classes = {
+    'LineByLine': '.opacities.linebyline',
+    'CKTable': '.opacities.ck',
+    'TransmissionRADTRANS': '.model.transmission',
+    'DirectImageRADTRANS': '.model.directimage',
+    'EmissionRADTRANS': '.model.emission',
+}
+
+__all__ = list(_classes)
+
+
+def __getattr__(name):
+    if name not in _classes:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    klass = getattr(importlib.import_module(_classes[name], __name__), name)
+    globals()[name] = klass
+    return klass
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_classes))
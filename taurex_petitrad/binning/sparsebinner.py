@@ -0,0 +1,104 @@
+import numpy as np
+from taurex.binning import FluxBinner
+from taurex.util.util import compute_bin_edges
+
+
+class SparseFluxBinner(FluxBinner):
+    """
+    :class:`~taurex.binning.FluxBinner` that stores the overlap weights
+    between the input grid and ``wngrid`` as a sparse
+    (n_bins, n_input) matrix. The matrix is built on the first call for
+    an input grid, binning is then a single sparse product, a
+    matrix-matrix product for a batch of spectra.
+
+    Parameters
+    ----------
+    wngrid: :obj:`array`
+        Wavenumber grid
+    wngrid_width: :obj:`array`, optional
+        Full bin widths of ``wngrid``, computed from ``wngrid`` if not given
+
+    """
+
+    def __init__(self, wngrid, wngrid_width=None):
+        super().__init__(wngrid, wngrid_width)
+        self._matrix_key = None
+        self._matrix = None
+
+    def _grid_key(self, wngrid, grid_width):
+        width_key = None
+        if grid_width is not None:
+            width_key = (np.shape(grid_width), float(np.sum(grid_width)))
+        return (wngrid.shape[0], float(wngrid[0]), float(wngrid[-1]),
+                float(wngrid.sum()), width_key)
+
+    def binning_matrix(self, wngrid, grid_width=None):
+        """
+        Sparse matrix mapping a spectrum on ``wngrid`` (in the order
+        given) to the binned grid
+        """
+        from scipy.sparse import csr_matrix
+
+        key = self._grid_key(wngrid, grid_width)
+        if key == self._matrix_key:
+            return self._matrix
+
+        order = wngrid.argsort()
+        old_spect_wn = wngrid[order]
+        old_spect_width = grid_width
+        if old_spect_width is None:
+            old_spect_width = compute_bin_edges(old_spect_wn)[-1]
+        else:
+            old_spect_width = np.broadcast_to(old_spect_width, wngrid.shape)[order]
+
+        old_spect_min = old_spect_wn - old_spect_width/2
+        old_spect_max = old_spect_wn + old_spect_width/2
+
+        new_spec_wn_min = self._wngrid - self._wngrid_width/2
+        new_spec_wn_max = self._wngrid + self._wngrid_width/2
+
+        last = old_spect_min.shape[0] - 1
+
+        rows = []
+        columns = []
+        weights = []
+        for idx, (wn_min, wn_max) in enumerate(zip(new_spec_wn_min, new_spec_wn_max)):
+            start = min(np.searchsorted(old_spect_max, wn_min, side='right'), last)
+            stop = min(np.searchsorted(old_spect_min[1:], wn_max, side='right'), last)
+            if not wn_min <= old_spect_max[start] or not old_spect_min[stop] <= wn_max:
+                continue
+            weight = (np.minimum(wn_max, old_spect_max[start:stop+1]) -
+                      np.maximum(old_spect_min[start:stop+1], wn_min))/(wn_max - wn_min)
+            rows.append(np.full(weight.shape[0], idx))
+            columns.append(order[start:stop+1])
+            weights.append(weight/np.sum(weight))
+
+        if len(rows) > 0:
+            rows = np.concatenate(rows)
+            columns = np.concatenate(columns)
+            weights = np.concatenate(weights)
+
+        self._matrix = csr_matrix((weights, (rows, columns)),
+                                  shape=(self._wngrid.shape[0], wngrid.shape[0]))
+        self._matrix_key = key
+        return self._matrix
+
+    def bindown(self, wngrid, spectrum, grid_width=None, error=None):
+        """
+        Bins down ``spectrum`` given on ``wngrid``, which may have
+        leading batch dimensions. See :class:`~taurex.binning.FluxBinner`
+        """
+        matrix = self.binning_matrix(wngrid, grid_width)
+
+        spectrum = np.asarray(spectrum)
+        flat = spectrum.reshape(-1, spectrum.shape[-1])
+        bin_spectrum = (matrix @ flat.T).T.reshape(spectrum.shape[:-1] + self._wngrid.shape)
+
+        bin_error = None
+        if error is not None:
+            error = np.asarray(error)
+            flat = error.reshape(-1, error.shape[-1])
+            bin_error = np.sqrt((matrix.multiply(matrix) @ (flat**2).T).T)
+            bin_error = bin_error.reshape(error.shape[:-1] + self._wngrid.shape)
+
+        return self._wngrid, bin_spectrum, bin_error, self._wngrid_width
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class AbundanceMap:
+    """
+    Converts the mixing ratio profiles of the chemistry to the mass
+    fraction dictionary passed to petitRADTRANS. The species order,
+    molecular weights and output arrays are set up once, each call is
+    then a few vectorised operations into the same buffers.
+
+    Parameters
+    ----------
+    active_gases: list
+        Active molecules in the order of ``activeGasMixProfile``
+    line_names: list
+        petitRADTRANS line species name of each active molecule
+    inactive_gases: list
+        Inactive molecules in the order of ``inactiveGasMixProfile``
+    nlayers: int
+        Number of layers
+
+    """
+
+    def __init__(self, active_gases, line_names, inactive_gases, nlayers):
+        from taurex.util.util import calculate_weight
+
+        self.key = (tuple(active_gases), tuple(inactive_gases), nlayers)
+        self.line_names = list(line_names)
+        self.inactive_gases = list(inactive_gases)
+        self._nactive = len(self.line_names)
+
+        molecules = list(active_gases) + self.inactive_gases
+        self._weights = np.array([calculate_weight(mol) for mol in molecules])[:, None]
+        self._buffer = np.empty((len(molecules), nlayers))
+        self._abundances = dict(zip(self.line_names + self.inactive_gases, self._buffer))
+
+    def __call__(self, active_profile, inactive_profile, mu):
+        """
+        Mass fractions from TauREx ordered (bottom first) mixing ratio
+        profiles and the mean molecular weight in amu in petitRADTRANS
+        (top first) order. The arrays returned are overwritten by the
+        next call.
+        """
+        active = self._buffer[:self._nactive]
+        inactive = self._buffer[self._nactive:]
+        np.multiply(self._weights[:self._nactive], active_profile[:, ::-1], out=active)
+        np.multiply(self._weights[self._nactive:], inactive_profile[:, ::-1], out=inactive)
+        self._buffer /= mu
+        return self._abundances
+
+    def batch(self, active_profiles, inactive_profiles, mu):
+        """
+        Mass fraction dictionaries of a batch of profiles converted at
+        once, with profiles of shape (N, n_gases, n_layers) and ``mu``
+        of shape (N, n_layers) ordered as in :func:`__call__`. Unlike
+        :func:`__call__` the arrays returned are not reused.
+        """
+        profiles = np.concatenate([active_profiles, inactive_profiles], axis=1)[:, :, ::-1]
+        fractions = self._weights*profiles/mu[:, None, :]
+        names = self.line_names + self.inactive_gases
+        return [dict(zip(names, sample)) for sample in fractions]
@@ -1,51 +1,48 @@
 from .petitradtrans import petitRADTRANSModel
 import numpy as np
-from taurex.exceptions import InvalidModelException
 from taurex.core import fitparam
+from ..util.timing import Timings
 
 class DirectImageRADTRANS(petitRADTRANSModel):
 
+    supports_chunks = True
+
     @classmethod
     def input_keywords(self):
         return ['directimage-petitrad', 'direct-petitrad', ]
 
     
 
-    def build_atmosphere_object(self):
-
-        return self._radtrans.Radtrans(line_species=self.linespecies, \
-                    rayleigh_species = self.rayleigh_species, \
-                    continuum_opacities = self.continuum_species, \
-                    wlen_bords_micron = self._wlen_micron)
-
-    def path_integral(self, wngrid, return_contrib):
-        from taurex.constants import RJUP,RSOL
-        import astropy.units as u
-
-        abundances, temperature, MMW, Rp, gravity, p0bar = self.setup_parameters()
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._flux_factors = {}
 
+    def build_atmosphere_object(self, wlen_bords_micron=None):
 
-        self.info('Molecular abundances at surface: %s',[ (k,v[-1]) for k,v in abundances.items()])
-        self.info('Temperature at surface %s',temperature[-1])
-        self.info('MMw at surface %s',MMW[-1])
-        self.info('Planet radius: %s',Rp)
-        self.info('Gravity in cm/2 at surface: %s',gravity)
-        self.info('P0 = radius: %s',p0bar)
+        return self._radtrans.Radtrans(**self.radtrans_arguments(wlen_bords_micron))
 
+    def atmosphere_spectrum(self, atmosphere, native_filt, context, abundances, temperature, MMW, Rp, gravity, p0bar):
+        with Timings().stage('calc_flux'):
+            atmosphere.calc_flux(temperature, abundances, gravity, MMW)
 
+        with Timings().stage('conversion'):
+            native = self.atmosphere_wavenumbers(atmosphere)
+            return atmosphere.flux[::-1][native_filt]*self.flux_conversion(native)[native_filt]
 
-        self._atmosphere.calc_flux(temperature, abundances, gravity, MMW)
-        integral = self._atmosphere.flux[::-1]
-        petit_flux_u = integral * u.erg / u.cm**2 / u.s / u.Hz
-
-        petit_flux_W = petit_flux_u.to(u.W/u.m**2/u.um, equivalencies=u.spectral_density(self.nativeWavenumberGrid*u.k)).value
-
-        #print(integral)
-        native = self.nativeWavenumberGrid
-        native_filt = (native >= wngrid.min()) & (native <= wngrid.max())
-
-        petit_flux_W = petit_flux_W[native_filt]
-        if np.any(np.isnan(petit_flux_W)):
-            raise InvalidModelException
-
-        return petit_flux_W, np.zeros(shape=(self.nLayers,wngrid.shape[0]))
\ No newline at end of file
+    def flux_conversion(self, native=None):
+        """
+        Factor converting petitRADTRANS flux in erg/cm2/s/Hz to W/m2/um
+        on the native grid (or that of a wavelength chunk), computed once
+        per grid
+        """
+        import astropy.units as u
+        if native is None:
+            native = self.nativeWavenumberGrid
+        key = (native.shape[0], native[0], native[-1])
+        factor = self._flux_factors.get(key)
+        if factor is None:
+            unit_flux = np.ones_like(native) * u.erg / u.cm**2 / u.s / u.Hz
+            factor = unit_flux.to(u.W/u.m**2/u.um,
+                                  equivalencies=u.spectral_density(native*u.k)).value
+            self._flux_factors[key] = factor
+        return factor
@@ -1,31 +1,69 @@
 from .directimage import DirectImageRADTRANS
+from ..util.timing import Timings
 
 class EmissionRADTRANS(DirectImageRADTRANS):
 
     @classmethod
     def input_keywords(self):
         return ['emission-petitrad', 'eclipse-petitrad', ]
-    
 
-    def compute_final_flux(self, f_total):
-        star_sed = self._star.spectralEmissionDensity
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._star_key = None
+        self._star_sed = None
+        self._stellar_factor = None
+        self._stellar_factor_sed = None
+        self._stellar_factor_key = None
 
-        self.debug('Star SED: %s', star_sed)
-        # quit()
-        star_radius = self._star.radius
-        planet_radius = self._planet.fullRadius
-        self.debug('star_radius %s', self._star.radius)
-        self.debug('planet_radius %s', self._star.radius)
-        last_flux = (f_total/star_sed) * (planet_radius/star_radius)**2
+    def initialize_star(self, wngrid):
+        """
+        Only initialises the star, and so rebuilds its SED, when the
+        grid or the star parameters changed since the last call
+        """
+        star = self._star
+        key = (id(star), star.temperature, star.radius,
+               tuple(x[2]() for x in star.fitting_parameters().values()),
+               wngrid.shape[0], wngrid[0], wngrid[-1])
+        if key == self._star_key and star.spectralEmissionDensity is self._star_sed:
+            return
+        super().initialize_star(wngrid)
+        self._star_key = key
+        self._star_sed = star.spectralEmissionDensity
 
-        self.debug('last_flux %s', last_flux)
+    def stellar_factor(self, wngrid):
+        """
+        ``(planet_radius/star_radius)**2/star_sed`` on ``wngrid``, only
+        rebuilt when the star SED or the radii change
+        """
+        star = self._star
+        star_sed = star.spectralEmissionDensity
+        key = (star_sed.shape[0], star.radius, self._planet.fullRadius)
+        if star_sed is not self._stellar_factor_sed or key != self._stellar_factor_key:
+            self.debug('Star SED: %s', star_sed)
+            self.debug('star_radius %s', star.radius)
+            self.debug('planet_radius %s', self._planet.fullRadius)
+            self._stellar_factor = (self._planet.fullRadius/star.radius)**2/star_sed
+            self._stellar_factor_sed = star_sed
+            self._stellar_factor_key = key
+        return self._stellar_factor
 
-        return last_flux
+    def spectrum_context(self, wngrid):
+        return dict(stellar_factor=self.stellar_factor(wngrid))
 
-    def path_integral(self, wngrid,return_contrib):
+    def compute_final_flux(self, f_total, context=None):
+        if context is None:
+            stellar_factor = (self._planet.fullRadius/self._star.radius)**2/self._star.spectralEmissionDensity
+        else:
+            stellar_factor = context['stellar_factor']
+        last_flux = f_total*stellar_factor
 
-        flux,tau = super().path_integral(wngrid,return_contrib)
+        self.debug('last_flux %s', last_flux)
+
+        return last_flux
 
-        return self.compute_final_flux(flux),tau
+    def compute_spectrum(self, wngrid, context, abundances, temperature, MMW, Rp, gravity, p0bar):
 
+        flux = super().compute_spectrum(wngrid, context, abundances, temperature, MMW, Rp, gravity, p0bar)
 
+        with Timings().stage('final_flux'):
+            return self.compute_final_flux(flux, context)
@@ -0,0 +1,81 @@
+import numpy as np
+from ..util.lru import digest
+
+
+class InterpolationCache:
+    """
+    Replaces ``interpolate_species_opa`` of a Radtrans object so that
+    calling it again with the same temperature profile restores the
+    previous result instead of interpolating every line opacity again.
+    Steps that only change abundances, clouds or hazes then only redo
+    the mixing and radiative transfer.
+
+    The snapshot is stored on the Radtrans object itself, it therefore
+    stays valid when the object is shared between models through the
+    :class:`~taurex_petitrad.model.radtranscache.RadtransCache`.
+
+    Parameters
+    ----------
+    atmosphere: :obj:`Radtrans`
+        Object to wrap, use :func:`install`
+
+    """
+
+    attributes = ('line_struc_kappas', 'continuum_opa', 'continuum_opa_scat',
+                  'continuum_opa_scat_emis', )
+
+    def __init__(self, atmosphere):
+        self._atmosphere = atmosphere
+        self._interpolate = atmosphere.interpolate_species_opa
+        self._key = None
+        self._snapshot = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def install(cls, atmosphere):
+        """
+        Wraps ``atmosphere`` if not done already, returns the wrapper
+        or ``None`` if the object has no ``interpolate_species_opa``
+        """
+        current = getattr(atmosphere, 'interpolate_species_opa', None)
+        if current is None or isinstance(current, cls):
+            return current
+        wrapper = cls(atmosphere)
+        atmosphere.interpolate_species_opa = wrapper
+        return wrapper
+
+    def __call__(self, temp, *args, **kwargs):
+        key = digest(temp, args, kwargs)
+        if key == self._key:
+            self.hits += 1
+            self._restore()
+            # Later stages (CIA, Planck function) read the profile set by the interpolation
+            self._atmosphere.temp = temp
+            return
+
+        self.misses += 1
+        self._key = None
+        self._interpolate(temp, *args, **kwargs)
+
+        snapshot = {}
+        for name in self.attributes:
+            value = getattr(self._atmosphere, name, None)
+            if isinstance(value, np.ndarray):
+                snapshot[name] = value.copy()
+        if 'line_struc_kappas' in snapshot:
+            self._snapshot = snapshot
+            self._key = key
+
+    def _restore(self):
+        for name, value in self._snapshot.items():
+            current = getattr(self._atmosphere, name, None)
+            if isinstance(current, np.ndarray) and current.shape == value.shape \
+                    and current.dtype == value.dtype and current.flags.writeable:
+                np.copyto(current, value)
+            else:
+                setattr(self._atmosphere, name, value.copy())
+
+    def clear(self):
+        self._key = None
+        self._snapshot = None
@@ -2,14 +2,26 @@
 import numpy as np
 from taurex.model import SimpleForwardModel
 import sys, os
+import weakref
+import logging
 from taurex.cache import GlobalCache
 from ..opacities.linebyline import LineByLine
 from ..opacities.ck import CKTable
 from taurex.core import fitparam
-from ..util import to_mass_frac
+from taurex.exceptions import InvalidModelException
+from .radtranscache import RadtransCache
+from .interpolationcache import InterpolationCache
+from .abundancemap import AbundanceMap
+from ..util.timing import Timings
+from ..util.lru import LRUCache, digest
+
+# Approximate native resolution (lambda/dlambda) of the petitRADTRANS grids
+NATIVE_RESOLUTION = {'lbl': 1e6, 'c-k': 1000}
+
 class petitRADTRANSModel(SimpleForwardModel):
 
     imported = False
+    supports_chunks = False
 
 
     def __init__(self,
@@ -82,27 +94,170 @@ class petitRADTRANSModel(SimpleForwardModel):
         self.continuum_species = continuum_species
         self._P0 = P0
 
+        self._atmosphere = None
+        self._atmosphere_future = None
+        self._abundance_map = None
+        self._native_atmosphere = None
+        self._chunk_pressures = None
+        self._chunk_layout = None
+        self._chunk_wngrids = weakref.WeakKeyDictionary()
+        self._spectral_layout = None
+        self._atmosphere_wngrid = None
+        self._native_wngrid = None
+        self._native_filters = {}
+        self._tau_buffer = None
+        self._memo = LRUCache(max_entries=0, sizeof=lambda x: x.nbytes)
+
+    def build(self):
+        if GlobalCache()['petitrad_prefetch']:
+            self.prefetch_atmosphere()
+        super().build()
+        if self.spectral_decomposition() is not None:
+            # Every process builds the model, gather the spectral layout now
+            # so nativeWavenumberGrid can be read from a single process
+            self.initialize_profiles()
+
     def initialize_profiles(self):
-        from taurex.util.util import conversion_factor
         super().initialize_profiles()
+        self.abundance_map()
 
         if not self._initialized_petit:
             self.info('Initializing petitRADTRANS')
-            self.linespecies = self.get_linespecies()
-            self.info('Detected active line species %s',self.linespecies)
-            self._atmosphere = self.build_atmosphere_object()
-            Pabar = conversion_factor('Pa','bar')
-            pressures = self.pressureProfile[::-1]*Pabar
-            self.info('Pressure at surface %s',pressures[-1])
-            self._atmosphere.setup_opa_structure(pressures)
+            pressures = self.radtrans_pressures()
+            bounds = None
+            decomposition = self.spectral_decomposition()
+            if decomposition is not None:
+                rank, size = decomposition
+                bounds = self.split_wavelengths(size)[rank]
+                self.info('Rank %s computing wavelengths %s of %s', rank, bounds, self._wlen_micron)
+            elif self.wavelength_chunks() is not None:
+                self.info('Evaluating %s wavelength chunks one at a time', len(self.wavelength_chunks()))
+                self._chunk_pressures = pressures
+                self._initialized_petit = True
+                return
+            self._atmosphere = RadtransCache().get(self.atmosphere_key(pressures, bounds),
+                                                   lambda: self.setup_atmosphere(pressures, bounds))
+            if GlobalCache()['petitrad_reuse_interpolation']:
+                InterpolationCache.install(self._atmosphere)
             self._initialized_petit = True
-    def build_atmosphere_object(self):
+
+        if self._spectral_layout is None and self.spectral_decomposition() is not None:
+            self.update_native_grid(self.atmosphere)
+
+    def radtrans_pressures(self):
+        """Detects the line species and returns the Radtrans pressure grid in bar"""
+        from taurex.util.util import conversion_factor
+        self.linespecies = self.get_linespecies()
+        self.info('Detected active line species %s',self.linespecies)
+        Pabar = conversion_factor('Pa','bar')
+        pressures = self.pressureProfile[::-1]*Pabar
+        self.info('Pressure at surface %s',pressures[-1])
+        return pressures
+
+    def prefetch_atmosphere(self):
+        """
+        Starts building the Radtrans object, which reads every line
+        opacity, on a background thread. The model only waits for it
+        when :attr:`atmosphere` is first used. Enabled from :func:`build`
+        with ``petitrad_prefetch`` in [Global], not under MPI so that no
+        MPI call is made from the background thread.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from taurex.mpi import nprocs
+        if self._initialized_petit or self.wavelength_chunks() is not None \
+                or self.spectral_decomposition() is not None:
+            return
+        if nprocs() > 1:
+            self.info('Radtrans prefetch disabled under MPI')
+            return
+        self.pressure.compute_pressure_profile()
+        pressures = self.radtrans_pressures()
+        self.info('Building Radtrans object in the background')
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        self._atmosphere_future = executor.submit(RadtransCache().get,
+                                                  self.atmosphere_key(pressures),
+                                                  lambda: self.setup_atmosphere(pressures))
+        executor.shutdown(wait=False)
+        self._initialized_petit = True
+
+    @property
+    def atmosphere(self):
+        """The Radtrans object, waits for it if it is still being built"""
+        if self._atmosphere_future is not None:
+            future = self._atmosphere_future
+            if not future.done():
+                self.info('Waiting for Radtrans object')
+            self._atmosphere = future.result()
+            self._atmosphere_future = None
+            if GlobalCache()['petitrad_reuse_interpolation']:
+                InterpolationCache.install(self._atmosphere)
+        return self._atmosphere
+
+    def setup_atmosphere(self, pressures, wlen_bords_micron=None):
+        atmosphere = self.build_atmosphere_object(wlen_bords_micron)
+        atmosphere.setup_opa_structure(pressures)
+        return atmosphere
+
+    def radtrans_arguments(self, wlen_bords_micron=None):
+        """
+        Keyword arguments used to construct the Radtrans object, these
+        also identify it in the :class:`RadtransCache`
+        """
+        return dict(line_species=self.linespecies,
+                    rayleigh_species=self.rayleigh_species,
+                    continuum_opacities=self.continuum_species,
+                    wlen_bords_micron=wlen_bords_micron or self._wlen_micron)
+
+    def wavelength_chunks(self):
+        """
+        Sub-ranges of ``wlen_bords_micron`` in micron, of equal width in
+        log wavelength and about ``petitrad_chunk_points`` native points
+        each, evaluated one at a time. ``None`` when not set in [Global]
+        or if the model does not support it.
+        """
+        points = GlobalCache()['petitrad_chunk_points']
+        if not points or not self.supports_chunks:
+            return None
+        low, high = self._wlen_micron
+        total = NATIVE_RESOLUTION[self._opacity_method]*np.log(high/low)
+        return self.split_wavelengths(max(1, int(np.ceil(total/points))))
+
+    def split_wavelengths(self, nchunks):
+        """``wlen_bords_micron`` split into ``nchunks`` ranges of equal width in log wavelength"""
+        edges = np.geomspace(self._wlen_micron[0], self._wlen_micron[1], nchunks + 1)
+        return [(float(a), float(b)) for a, b in zip(edges[:-1], edges[1:])]
+
+    def spectral_decomposition(self):
+        """
+        MPI rank and number of processes when ``petitrad_spectral_mpi``
+        is set in [Global]: each process then builds the Radtrans object
+        of one sub-range of ``wlen_bords_micron`` and the spectra are
+        gathered. ``None`` without MPI or if not supported by the model.
+        """
+        from taurex.mpi import get_rank, nprocs
+        if not GlobalCache()['petitrad_spectral_mpi'] or not self.supports_chunks:
+            return None
+        size = nprocs()
+        if size <= 1:
+            return None
+        return get_rank(), size
+
+    def atmosphere_key(self, pressures, wlen_bords_micron=None):
+        key = []
+        for name, value in sorted(self.radtrans_arguments(wlen_bords_micron).items()):
+            if isinstance(value, (list, tuple, np.ndarray)):
+                value = tuple(value) if name == 'wlen_bords_micron' else tuple(sorted(value))
+            key.append((name, value))
+        return tuple(key), np.ascontiguousarray(pressures).tobytes()
+
+    def build_atmosphere_object(self, wlen_bords_micron=None):
         raise NotImplementedError
 
 
-    def get_linespecies(self):
+    def line_species_names(self):
+        """petitRADTRANS line species of each active gas"""
         import pathlib
-        from taurex.util.util import get_molecular_weight
         opacity_list = None
         if self._opacity_method == 'c-k':
             opacity_list = CKTable.discover()
@@ -112,68 +267,215 @@ class petitRADTRANSModel(SimpleForwardModel):
         opacity_dictionary = {x:pathlib.Path(y).stem for x,y in opacity_list}
         active_gases = self.chemistry.activeGases
 
-        return list(set([opacity_dictionary[x] for x in active_gases]))
+        return [opacity_dictionary[x] for x in active_gases]
+
+    def get_linespecies(self):
+        """Line species of the active gases, once each in the order of ``activeGases``"""
+        return list(dict.fromkeys(self.line_species_names()))
+
+    def abundance_map(self):
+        """
+        :class:`AbundanceMap` of the current chemistry, rebuilt only
+        when its gases or the number of layers change
+        """
+        chemistry = self.chemistry
+        key = (tuple(chemistry.activeGases), tuple(chemistry.inactiveGases), self.nLayers)
+        if self._abundance_map is None or self._abundance_map.key != key:
+            self._abundance_map = AbundanceMap(chemistry.activeGases, self.line_species_names(),
+                                               chemistry.inactiveGases, self.nLayers)
+        return self._abundance_map
 
 
     
+    def chunk_layout(self):
+        """
+        For each wavelength chunk, in ascending wavenumber, its bounds,
+        the slice of its native grid it contributes and the slice of
+        :attr:`nativeWavenumberGrid` it fills. Points are assigned to the
+        chunk whose half-open wavelength range contains them, so a point
+        at a chunk edge is only computed once. Built once from the
+        Radtrans object of every chunk, which are kept for
+        :func:`chunked_spectrum` by the :class:`RadtransCache`.
+        """
+        if self._chunk_layout is not None:
+            return self._chunk_layout
+
+        chunks = self.wavelength_chunks()
+        grids = []
+        layout = []
+        offset = 0
+        for index, bounds in reversed(list(enumerate(chunks))):
+            atmosphere = self.chunk_atmosphere(bounds)
+            wngrid = self.atmosphere_wavenumbers(atmosphere)
+            del atmosphere
+            local = self.chunk_points(wngrid, bounds, index == len(chunks) - 1)
+            if local.stop == local.start:
+                continue
+            grids.append(wngrid[local])
+            layout.append((bounds, local, slice(offset, offset + grids[-1].shape[0])))
+            offset += grids[-1].shape[0]
+
+        self._native_wngrid = np.concatenate(grids)
+        self._native_filters = {}
+        self._tau_buffer = None
+        self._memo.clear()
+        self._chunk_layout = layout
+        return layout
+
+    def chunk_atmosphere(self, bounds):
+        """
+        Radtrans object of the wavelength chunk ``bounds``, reused from
+        the :class:`RadtransCache` if it holds it
+        """
+        pressures = self._chunk_pressures
+        return RadtransCache().get(self.atmosphere_key(pressures, bounds),
+                                   lambda: self.setup_atmosphere(pressures, bounds))
+
+    def chunk_points(self, wngrid, bounds, last):
+        """
+        Slice of the ascending ``wngrid`` of a chunk within its half-open
+        wavelength range ``bounds``, closed if it is the ``last`` chunk
+        """
+        wavelength = 10000/wngrid
+        keep = wavelength >= bounds[0]
+        if last:
+            keep &= wavelength <= bounds[1]
+        else:
+            keep &= wavelength < bounds[1]
+        keep = np.flatnonzero(keep)
+        if keep.shape[0] == 0:
+            return slice(0, 0)
+        return slice(keep[0], keep[-1] + 1)
+
+    def spectral_layout(self, wngrid):
+        """
+        Gathers the points of every process under the spectral
+        decomposition. Returns the full native grid, the slice of
+        ``wngrid`` (this process' grid) it contributes and the slice of
+        the native grid that it fills.
+        """
+        from taurex.mpi import allgather
+        rank, size = self.spectral_decomposition()
+        bounds = self.split_wavelengths(size)[rank]
+        local = self.chunk_points(wngrid, bounds, rank == size - 1)
+
+        # Ranks hold ascending wavelengths, the native grid is ascending in wavenumber
+        grids = allgather(wngrid[local])
+        offset = sum(x.shape[0] for x in grids[rank + 1:])
+        native = np.concatenate(grids[::-1])
+        return native, local, slice(offset, offset + local.stop - local.start)
+
+    def atmosphere_wavenumbers(self, atmosphere):
+        """Ascending wavenumber grid in cm-1 of a Radtrans object, computed once per object"""
+        from taurex.constants import SPDLIGT
+        if atmosphere is self._native_atmosphere:
+            return self._atmosphere_wngrid
+        wngrid = self._chunk_wngrids.get(atmosphere)
+        if wngrid is None:
+            wngrid = atmosphere.freq[::-1]/SPDLIGT/100
+            self._chunk_wngrids[atmosphere] = wngrid
+        return wngrid
+
+    def update_native_grid(self, atmosphere):
+        """
+        Native grid of ``atmosphere``, gathered from every process under
+        the spectral decomposition. Collective in that case, it is
+        therefore only called from :func:`initialize_profiles`.
+        """
+        from taurex.constants import SPDLIGT
+        self._atmosphere_wngrid = atmosphere.freq[::-1]/SPDLIGT/100
+        self._native_wngrid = self._atmosphere_wngrid
+        self._spectral_layout = None
+        if self.spectral_decomposition() is not None:
+            self._native_wngrid, local, position = self.spectral_layout(self._atmosphere_wngrid)
+            self._spectral_layout = (local, position)
+        self._native_atmosphere = atmosphere
+        self._native_filters = {}
+        self._tau_buffer = None
+        self._memo.clear()
+
     @property
     def nativeWavenumberGrid(self):
-        from taurex.constants import SPDLIGT
-        return self._atmosphere.freq[::-1]/SPDLIGT/100
+        if self._chunk_pressures is not None:
+            self.chunk_layout()
+            return self._native_wngrid
+        atmosphere = self.atmosphere
+        if self._native_atmosphere is not atmosphere:
+            if self.spectral_decomposition() is not None:
+                raise RuntimeError('The spectral layout is gathered by initialize_profiles, '
+                                   'build the model on every process first')
+            self.update_native_grid(atmosphere)
+        return self._native_wngrid
+
+    def native_filter(self, wngrid):
+        """
+        Slice of :attr:`nativeWavenumberGrid` within the range of ``wngrid``,
+        computed once per grid range
+        """
+        native = self.nativeWavenumberGrid
+        bounds = (wngrid.min(), wngrid.max())
+        native_filt = self._native_filters.get(bounds)
+        if native_filt is None:
+            native_filt = slice(np.searchsorted(native, bounds[0], side='left'),
+                                np.searchsorted(native, bounds[1], side='right'))
+            self._native_filters[bounds] = native_filt
+        return native_filt
+
+    def tau_buffer(self, wngrid):
+        """
+        Zero optical depth array returned from :func:`path_integral`.
+        It is reused between calls and therefore read-only, copy it
+        before writing into it.
+        """
+        shape = (self.nLayers, wngrid.shape[0])
+        if self._tau_buffer is None or self._tau_buffer.shape != shape:
+            self._tau_buffer = np.zeros(shape=shape)
+            self._tau_buffer.flags.writeable = False
+        return self._tau_buffer
 
     def build_abundance(self):
-        import pathlib
-        from taurex.util.util import get_molecular_weight
         from taurex.constants import AMU
 
-        active_gases = self.chemistry.activeGases
-        active_profile =self.chemistry.activeGasMixProfile[:,::-1]
-        inactive_gases = self.chemistry.inactiveGases
-        inactive_profile = self.chemistry.inactiveGasMixProfile[:,::-1]
         mu= self.chemistry.muProfile[::-1]/AMU
 
-        abundance = {}
-
-        for mol,prof,petit_name in zip(active_gases,active_profile,self.linespecies):
-            abundance[petit_name] =to_mass_frac(mol,prof,mu)
-        
-        # for mol in self.rayleigh_species:
-        #     if mol in abundance:
-        #         continue
-        #     if mol in active_gases or mol in self.chemistry.inactiveGases:
-        #         mol_weight = get_molecular_weight(mol)
-        #         prof = self.chemistry.get_gas_mix_profile(mol)[::-1]
-        #         abundance[mol] = to_mass_frac(mol,prof,mu)
-
-        # for cia in self.continuum_species:
-
-        #     for mol in cia.split('-'):
-        #         if mol in abundance:
-        #             continue
-        #         if mol in active_gases or mol in self.chemistry.inactiveGases:
-        #             mol_weight = get_molecular_weight(mol)
-        #             prof = self.chemistry.get_gas_mix_profile(mol)[::-1]
-        #             abundance[mol] = to_mass_frac(mol,prof,mu)
-        for mol,prof in zip(inactive_gases,inactive_profile):
-            abundance[mol] =to_mass_frac(mol,prof,mu)
-
-        return abundance
+        return self.abundance_map()(self.chemistry.activeGasMixProfile,
+                                    self.chemistry.inactiveGasMixProfile, mu)
 
     def setup_parameters(self):
-        from taurex.util.util import conversion_factor
         from taurex.constants import AMU
-        from petitRADTRANS import nat_cst as nc
 
-        Pabar = conversion_factor('Pa','bar')
-        
-        abundances = self.build_abundance()
+        with Timings().stage('build_abundance'):
+            abundances = self.build_abundance()
 
         temperature = self.temperatureProfile[::-1]
 
         MMW = self.chemistry.muProfile[::-1]/AMU
 
+        Rp, gravity, p0bar = self.planet_parameters()
+
+        return abundances, temperature, MMW, Rp, gravity, p0bar
+
+    def planet_parameters(self):
+        """Planet radius in cm, gravity at P0 in cm/s2 and P0 in bar"""
+        from taurex.util.util import conversion_factor
+        from petitRADTRANS import nat_cst as nc
+
+        Pabar = conversion_factor('Pa','bar')
+
         Rp = self.planet.radius*nc.r_jup_mean
 
+        P0, idx = self.reference_layer()
+
+        p0bar = P0*Pabar
+
+        altitude = self.altitudeProfile[idx]
+
+        gravity = self.planet.gravity_at_height(altitude)*100
+
+        return Rp, gravity, p0bar
+
+    def reference_layer(self):
+        """P0 in Pa clamped to the pressure profile and the index of its nearest layer"""
         P0 = self._P0
         if self._P0 == -1:
             P0 = 1e999
@@ -181,16 +483,270 @@ class petitRADTRANSModel(SimpleForwardModel):
         P0 = min(self.pressureProfile[0],P0)
         P0 = max(self.pressureProfile[-1],P0)
 
-        p0bar = P0*Pabar
+        return P0, self.nearest_layer(P0)
 
-        idx = (np.abs(self.pressureProfile - P0)).argmin()
+    def nearest_layer(self, pressure):
+        """Index of the layer closest to ``pressure`` in Pa, the deeper one on ties"""
+        # The profile is descending, search its ascending view
+        profile = self.pressureProfile
+        nlayers = profile.shape[0]
+        shallower = nlayers - np.searchsorted(profile[::-1], pressure)
+        deeper = max(shallower - 1, 0)
+        if shallower < nlayers and pressure - profile[shallower] < profile[deeper] - pressure:
+            return shallower
+        return deeper
 
-        altitude = self.altitudeProfile[idx]
+    def spectrum_context(self, wngrid):
+        """
+        Model state besides the atmospheric profiles that
+        :func:`compute_spectrum` depends on on ``wngrid``, such as cloud
+        or stellar parameters
+        """
+        return None
 
-        gravity = self.planet.gravity_at_height(altitude)*100
+    def compute_spectrum(self, wngrid, context, abundances, temperature, MMW, Rp, gravity, p0bar):
+        """
+        Runs petitRADTRANS for the given profiles and returns the
+        spectrum on ``wngrid``, a subset of the native grid
+        """
+        if self._chunk_pressures is not None:
+            return self.chunked_spectrum(wngrid, context, abundances, temperature, MMW, Rp, gravity, p0bar)
+        if self._spectral_layout is not None:
+            return self.gathered_spectrum(wngrid, context, abundances, temperature, MMW, Rp, gravity, p0bar)
+        return self.atmosphere_spectrum(self.atmosphere, self.native_filter(wngrid), context,
+                                        abundances, temperature, MMW, Rp, gravity, p0bar)
+
+    def atmosphere_spectrum(self, atmosphere, native_filt, context, abundances, temperature, MMW, Rp, gravity, p0bar):
+        """
+        Runs ``atmosphere`` for the given profiles and returns the
+        spectrum on the slice ``native_filt`` of its native grid
+        """
+        raise NotImplementedError
 
+    def chunked_spectrum(self, wngrid, context, abundances, temperature, MMW, Rp, gravity, p0bar):
+        """
+        :func:`compute_spectrum` running the Radtrans object of one
+        wavelength chunk at a time, chunks outside of ``wngrid`` are
+        skipped. Chunks are only rebuilt when the :class:`RadtransCache`
+        does not hold them.
+        """
+        native_filt = self.native_filter(wngrid)
+        spectrum = np.empty(native_filt.stop - native_filt.start)
+        for bounds, local, position in self.chunk_layout():
+            start = max(position.start, native_filt.start)
+            stop = min(position.stop, native_filt.stop)
+            if stop <= start:
+                continue
+            atmosphere = self.chunk_atmosphere(bounds)
+            chunk_filt = slice(local.start + start - position.start,
+                               local.start + stop - position.start)
+            spectrum[start - native_filt.start:stop - native_filt.start] = \
+                self.atmosphere_spectrum(atmosphere, chunk_filt, context, abundances,
+                                         temperature, MMW, Rp, gravity, p0bar)
+            del atmosphere
+        return spectrum
+
+    def gathered_spectrum(self, wngrid, context, abundances, temperature, MMW, Rp, gravity, p0bar):
+        """
+        :func:`compute_spectrum` under the spectral decomposition, every
+        process runs its sub-range and the parts are gathered. Must be
+        called by all processes with the same parameters.
+        """
+        from taurex.mpi import allgather
+        native_filt = self.native_filter(wngrid)
+        local, position = self._spectral_layout
+        start = max(position.start, native_filt.start)
+        stop = min(position.stop, native_filt.stop)
+        part = np.empty(0)
+        if stop > start:
+            part = self.atmosphere_spectrum(self.atmosphere,
+                                            slice(local.start + start - position.start,
+                                                  local.start + stop - position.start),
+                                            context, abundances, temperature, MMW, Rp, gravity, p0bar)
+        return np.concatenate(allgather(part)[::-1])
+
+    def memo_enabled(self):
+        """
+        Updates the spectrum memo bounds from ``petitrad_memo_entries``
+        and ``petitrad_memo_bytes`` in [Global], returns whether it is used
+        """
+        entries = int(GlobalCache()['petitrad_memo_entries'] or 0)
+        max_bytes = GlobalCache()['petitrad_memo_bytes']
+        self._memo.resize(max_entries=entries,
+                          max_bytes=int(max_bytes) if max_bytes is not None else None)
+        return entries > 0
 
-        return abundances, temperature, MMW, Rp, gravity, p0bar
+    def memo_stats(self):
+        """Entries, bytes, hits, misses and evictions of the spectrum memo"""
+        return self._memo.stats()
+
+    def clear_memo(self):
+        self._memo.clear()
+
+    def memoized_spectrum(self, wngrid, context, abundances, temperature, MMW, Rp, gravity, p0bar):
+        """
+        :func:`compute_spectrum` through the spectrum memo, keyed on every
+        input so any change of profiles, P0, cloud or stellar parameters
+        gives a new entry
+        """
+        if not self.memo_enabled():
+            return self.compute_spectrum(wngrid, context, abundances, temperature,
+                                         MMW, Rp, gravity, p0bar)
+
+        key = digest(wngrid, context, abundances, temperature, MMW, Rp, gravity, p0bar)
+        spectrum = self._memo.get(key)
+        if spectrum is None:
+            spectrum = self.compute_spectrum(wngrid, context, abundances, temperature,
+                                             MMW, Rp, gravity, p0bar)
+            self._memo.put(key, spectrum.copy())
+        else:
+            spectrum = spectrum.copy()
+        return spectrum
+
+    def path_integral(self, wngrid, return_contrib):
+        with Timings().stage('setup_parameters'):
+            abundances, temperature, MMW, Rp, gravity, p0bar = self.setup_parameters()
+
+        if self._logger.isEnabledFor(logging.INFO):
+            self.info('Molecular abundances at surface: %s',[ (k,v[-1]) for k,v in abundances.items()])
+            self.info('Temperature at surface %s',temperature[-1])
+            self.info('MMw at surface %s',MMW[-1])
+            self.info('Planet radius: %s',Rp)
+            self.info('Gravity in cm/2 at surface: %s',gravity)
+            self.info('P0 = radius: %s',p0bar)
+
+        with Timings().stage('compute_spectrum'):
+            spectrum = self.memoized_spectrum(wngrid, self.spectrum_context(wngrid), abundances,
+                                              temperature, MMW, Rp, gravity, p0bar)
+
+        if np.isnan(spectrum.sum()):
+            raise InvalidModelException
+
+        return spectrum, self.tau_buffer(wngrid)
+
+    def initialize_star(self, wngrid):
+        """Initialises the star on ``wngrid`` before the path integral"""
+        self._star.initialize(wngrid)
+
+    def model(self, wngrid=None, cutoff_grid=True):
+        from taurex.util.util import clip_native_to_wngrid
+
+        if not self.built:
+            self.build()
+        self.initialize_profiles()
+
+        native_grid = self.nativeWavenumberGrid
+        if wngrid is not None and cutoff_grid:
+            native_grid = clip_native_to_wngrid(native_grid, wngrid)
+
+        self.initialize_star(native_grid)
+        for contrib in self.contribution_list:
+            contrib.prepare(self, native_grid)
+
+        spectrum, tau = self.path_integral(native_grid, False)
+        return native_grid, spectrum, tau, None
+
+    def model_batch(self, params, param_names=None, wngrid=None, cutoff_grid=True, binner=None):
+        """
+        Computes the forward model for a batch of parameter vectors.
+        Profiles are built for every vector first, the conversion to
+        mass fractions, the mean molecular weights and the gravity at P0
+        are then computed for the whole batch at once before running
+        petitRADTRANS on each vector. The parameters are restored to
+        their original values afterwards.
+
+        Parameters
+        ----------
+        params: :obj:`array`
+            Shape (N, n_params), values as set through ``model[name]``
+            (not log10 for log fitted parameters)
+        param_names: list, optional
+            Fitting parameter of each column, defaults to the parameters
+            fitted by default
+        wngrid: :obj:`array`, optional
+            Clips the native grid like :func:`model`
+        binner: :class:`~taurex_petitrad.binning.sparsebinner.SparseFluxBinner`, optional
+            Bins all the spectra at once instead of returning them
+            on the native grid
+
+        Returns
+        -------
+        native_grid: :obj:`array`
+            Binned grid if ``binner`` is given
+        spectra: :obj:`array`
+            Shape (N, n_wavenumbers), rows of invalid models are NaN
+
+        """
+        from taurex.constants import AMU, G
+        from taurex.util.util import clip_native_to_wngrid, conversion_factor
+        from petitRADTRANS import nat_cst as nc
+
+        if param_names is None:
+            param_names = [k for k, v in self.fittingParameters.items() if v[5]]
+        params = np.atleast_2d(np.asarray(params, dtype=np.float64))
+        if params.shape[1] != len(param_names):
+            raise ValueError('Expected {} parameters per vector, got {}'.format(
+                len(param_names), params.shape[1]))
+
+        if not self.built:
+            self.build()
+
+        original = [self[name] for name in param_names]
+        native_grid = None
+        samples = []
+        try:
+            for index, values in enumerate(params):
+                for name, value in zip(param_names, values):
+                    self[name] = value
+                try:
+                    self.initialize_profiles()
+                    if native_grid is None:
+                        native_grid = self.nativeWavenumberGrid
+                        if wngrid is not None and cutoff_grid:
+                            native_grid = clip_native_to_wngrid(native_grid, wngrid)
+                    self.initialize_star(native_grid)
+                    P0, layer = self.reference_layer()
+                    samples.append((index,
+                                    np.array(self.chemistry.activeGasMixProfile),
+                                    np.array(self.chemistry.inactiveGasMixProfile),
+                                    np.array(self.chemistry.muProfile),
+                                    np.array(self.temperatureProfile[::-1]),
+                                    (self.planet.radius, self.planet.fullRadius, self.planet.fullMass,
+                                     self.altitudeProfile[layer], P0),
+                                    self.spectrum_context(native_grid)))
+                except InvalidModelException:
+                    self.warning('Invalid model for parameters %s', values)
+        finally:
+            for name, value in zip(param_names, original):
+                self[name] = value
+
+        if native_grid is None:
+            return None, np.full((params.shape[0], 0), np.nan)
+
+        spectra = np.full((params.shape[0], native_grid.shape[0]), np.nan)
+        valid = np.zeros(params.shape[0], dtype=bool)
+        if len(samples) > 0:
+            index, active, inactive, mu, temperature, planet, context = zip(*samples)
+            MMW = np.stack(mu)[:, ::-1]/AMU
+            abundances = self.abundance_map().batch(np.stack(active), np.stack(inactive), MMW)
+
+            # Same as planet_parameters for every vector
+            radius, full_radius, mass, altitude, P0 = np.array(planet).T
+            Rp = radius*nc.r_jup_mean
+            gravity = G*mass/(full_radius + altitude)**2*100
+            p0bar = P0*conversion_factor('Pa','bar')
+
+            for sample in range(len(samples)):
+                spectra[index[sample]] = self.memoized_spectrum(native_grid, context[sample], abundances[sample],
+                                                                temperature[sample], MMW[sample],
+                                                                Rp[sample], gravity[sample], p0bar[sample])
+            valid[list(index)] = True
+
+        if binner is not None:
+            native_grid, spectra, _, _ = binner.bindown(native_grid, spectra)
+            spectra[~valid] = np.nan
+
+        return native_grid, spectra
 
     @fitparam(param_name='P0_radius', param_latex='P$_0$',default_fit=False,default_mode='log',default_bounds=[2,-5])
     def P0(self):
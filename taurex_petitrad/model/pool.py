@@ -0,0 +1,119 @@
+import numpy as np
+from taurex.log import Logger
+
+_worker_model = None
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+def _evaluate(args):
+    params, param_names, wngrid, cutoff_grid = args
+    return _worker_model.model_batch(params, param_names, wngrid, cutoff_grid)
+
+
+class ForwardModelPool(Logger):
+    """
+    Evaluates a petitRADTRANS forward model on several local processes.
+
+    The model is built and its Radtrans object initialised in this
+    process before the workers are forked, each worker therefore
+    starts with the loaded opacities which stay shared with the parent
+    (copy-on-write) instead of being read again. Requires the ``fork``
+    start method (Linux, macOS).
+
+    Parameters
+    ----------
+    model: :class:`~taurex_petitrad.model.petitradtrans.petitRADTRANSModel`
+        Model to evaluate
+    processes: int, optional
+        Number of worker processes, defaults to the number of cores
+
+    """
+
+    def __init__(self, model, processes=None):
+        super().__init__(self.__class__.__name__)
+        import os
+        import multiprocessing
+
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise ValueError('ForwardModelPool requires the fork start method')
+
+        if not model.built:
+            model.build()
+        model.initialize_profiles()
+        # A prefetched Radtrans object must be ready before forking
+        model.atmosphere
+
+        self._model = model
+        self._processes = processes or os.cpu_count() or 1
+        self.info('Starting %s worker processes', self._processes)
+        self._pool = multiprocessing.get_context('fork').Pool(self._processes,
+                                                               initializer=_init_worker,
+                                                               initargs=(model,))
+
+    @property
+    def processes(self):
+        return self._processes
+
+    def map(self, params, param_names=None, wngrid=None, cutoff_grid=True, chunksize=None, binner=None):
+        """
+        Computes the spectra of a batch of parameter vectors, see
+        :func:`~taurex_petitrad.model.petitradtrans.petitRADTRANSModel.model_batch`
+        for the arguments.
+
+        Parameters
+        ----------
+        chunksize: int, optional
+            Parameter vectors sent to a worker at once, defaults to
+            spreading the batch evenly over the workers
+        binner: :class:`~taurex_petitrad.binning.sparsebinner.SparseFluxBinner`, optional
+            Bins the gathered spectra at once
+
+        Returns
+        -------
+        native_grid: :obj:`array`
+        spectra: :obj:`array`
+            Shape (N, n_wavenumbers)
+
+        """
+        params = np.atleast_2d(np.asarray(params, dtype=np.float64))
+        if params.shape[0] == 0:
+            return self._model.model_batch(params, param_names, wngrid, cutoff_grid, binner)
+
+        chunksize = chunksize or int(np.ceil(params.shape[0]/self._processes))
+        chunks = [params[start:start+chunksize]
+                  for start in range(0, params.shape[0], chunksize)]
+
+        results = self._pool.map(_evaluate,
+                                 [(chunk, param_names, wngrid, cutoff_grid) for chunk in chunks])
+
+        native_grid = next((grid for grid, _ in results if grid is not None), None)
+        if native_grid is None:
+            return None, np.full((params.shape[0], 0), np.nan)
+        spectra = np.full((params.shape[0], native_grid.shape[0]), np.nan)
+        start = 0
+        for chunk, (grid, chunk_spectra) in zip(chunks, results):
+            if grid is not None:
+                spectra[start:start+chunk.shape[0]] = chunk_spectra
+            start += chunk.shape[0]
+        if binner is not None:
+            invalid = np.isnan(spectra).all(axis=1)
+            native_grid, spectra, _, _ = binner.bindown(native_grid, spectra)
+            spectra[invalid] = np.nan
+        return native_grid, spectra
+
+    def close(self):
+        """Stops the worker processes"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
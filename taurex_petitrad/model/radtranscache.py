@@ -0,0 +1,52 @@
+from taurex.cache.singleton import Singleton
+from taurex.log import Logger
+from ..util.lru import LRUCache
+
+
+class RadtransCache(Singleton):
+    """
+    Process-wide cache of initialised petitRADTRANS ``Radtrans`` objects
+    so that models sharing the same species, wavelength range and
+    pressure grid only read the opacities once.
+
+    The number of objects kept is set through ``petitrad_radtrans_cache``
+    in [Global], the cache is disabled when it is not set or zero.
+    The least recently used object is dropped first.
+    """
+
+    def init(self):
+        self._cache = LRUCache(max_entries=0)
+        self.log = Logger('RadtransCache')
+
+    def _update_size(self):
+        from taurex.cache import GlobalCache
+        size = GlobalCache()['petitrad_radtrans_cache'] or 0
+        self._cache.resize(max_entries=int(size))
+        return int(size)
+
+    def get(self, key, builder):
+        """
+        Returns the object stored for ``key``, building it with
+        ``builder()`` and storing it if missing.
+        """
+        if self._update_size() <= 0:
+            return builder()
+
+        atmosphere = self._cache.get(key)
+        if atmosphere is None:
+            self.log.info('Building new Radtrans object')
+            atmosphere = builder()
+            self._cache.put(key, atmosphere)
+        else:
+            self.log.info('Reusing cached Radtrans object')
+        return atmosphere
+
+    def clear(self):
+        """Drops every cached object"""
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+    def __len__(self):
+        return len(self._cache)
@@ -1,10 +1,11 @@
 from .petitradtrans import petitRADTRANSModel
-import numpy as np
-from taurex.exceptions import InvalidModelException
 from taurex.core import fitparam
+from ..util.timing import Timings
 
 class TransmissionRADTRANS(petitRADTRANSModel):
 
+    supports_chunks = True
+
     @classmethod
     def input_keywords(self):
         return ['transmission-petitrad', 'transit-petitrad', ]
@@ -48,60 +49,37 @@ class TransmissionRADTRANS(petitRADTRANSModel):
         self._cloud_pressure = Pcloud
         self.include_condensates = False
 
-    def build_atmosphere_object(self):
+    def build_atmosphere_object(self, wlen_bords_micron=None):
         cloud_species = None
         if self.include_condensates:
             pass
 
-        return self._radtrans.Radtrans(line_species=self.linespecies, \
-                    rayleigh_species = self.rayleigh_species, \
-                    continuum_opacities = self.continuum_species, \
-                    wlen_bords_micron = self._wlen_micron)
+        return self._radtrans.Radtrans(**self.radtrans_arguments(wlen_bords_micron))
     
 
-    def path_integral(self, wngrid, return_contrib):
-        from taurex.constants import RJUP,RSOL
-        from petitRADTRANS import nat_cst as nc
-        import astropy.units as u
-        abundances, temperature, MMW, Rp, gravity, p0bar = self.setup_parameters()
-
-
-        self.info('Molecular abundances at surface: %s',[ (k,v[-1]) for k,v in abundances.items()])
-        self.info('Temperature at surface %s',temperature[-1])
-        self.info('MMw at surface %s',MMW[-1])
-        self.info('Planet radius: %s',Rp)
-        self.info('Gravity in cm/2 at surface: %s',gravity)
-        self.info('P0 = radius: %s',p0bar)
-
+    def spectrum_context(self, wngrid):
         Pcloud = self._cloud_pressure
 
         if Pcloud is not None:
             Pcloud = Pcloud*1e-5
 
+        return dict(star_radius=self.star.radius*100, Pcloud=Pcloud,
+                    gamma_scat=self._gamma_scat, kappa_zero=self._kappa_zero,
+                    haze_factor=self._haze_factor)
 
-        self._atmosphere.calc_transm(temperature, abundances, gravity, MMW, R_pl=Rp, P0_bar=p0bar, Pcloud=Pcloud,
-                                     gamma_scat=self._gamma_scat,kappa_zero=self._kappa_zero, haze_factor=self._haze_factor,
-                                     variable_gravity=True)
-
-        Rs = self.star.radius*100
-        integral = self._atmosphere.transm_rad**2
-        # petit_flux_u = integral*u.erg/u.cm**2/u.s/u.Hz
-
-        # petit_flux_W = petit_flux_u.to(u.W/u.m**2/u.um, equivalencies=u.spectral_density(self.nativeWavenumberGrid*u.k)).value
-
-        #print(integral)
-
-        rprs2 = (integral[::-1])/Rs**2
-
-        native = self.nativeWavenumberGrid
+    def atmosphere_spectrum(self, atmosphere, native_filt, context, abundances, temperature, MMW, Rp, gravity, p0bar):
+        with Timings().stage('calc_transm'):
+            atmosphere.calc_transm(temperature, abundances, gravity, MMW, R_pl=Rp, P0_bar=p0bar, Pcloud=context['Pcloud'],
+                                   gamma_scat=context['gamma_scat'],kappa_zero=context['kappa_zero'], haze_factor=context['haze_factor'],
+                                   variable_gravity=True)
 
-        native_filt = (native >= wngrid.min()) & (native <= wngrid.max())
+        with Timings().stage('filter'):
+            Rs = context['star_radius']
+            integral = atmosphere.transm_rad**2
 
-        rprs2 = rprs2[native_filt]
-        if np.any(np.isnan(rprs2)):
-            raise InvalidModelException
+            rprs2 = (integral[::-1])/Rs**2
 
-        return rprs2, np.zeros(shape=(self.nLayers,wngrid.shape[0]))
+            return rprs2[native_filt]
 
     @fitparam(param_name='kappa_zero', param_latex='$\kappa_0$',default_fit=False,default_mode='linear',default_bounds=[0.01,2.0])
     def kappaZero(self):
@@ -113,11 +91,11 @@ class TransmissionRADTRANS(petitRADTRANSModel):
 
     @fitparam(param_name='gamma_scat', param_latex='$\gamma$',default_fit=False,default_mode='linear',default_bounds=[-4,2])
     def gamma(self):
-        return self._gamma
+        return self._gamma_scat
     
     @gamma.setter
     def gamma(self, value):
-        self._gamma = value
+        self._gamma_scat = value
 
     @fitparam(param_name='clouds_pressure',
               param_latex='$P_\mathrm{clouds}$',
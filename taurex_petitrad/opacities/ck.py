@@ -3,53 +3,22 @@ from taurex.opacity import InterpolatingOpacity
 import pathlib
 import numpy as np
 from taurex.util.util import calculate_weight
+from ..util.gridcache import GridCacheMixin
+from ..util.workers import load_workers, run_threaded
+from ..util.window import clip_range, wavenumber_window, storage_dtype, grid_ranges, bracket
+from ..util.index import folder_entry
+from .discovery import discover_ktables, KTABLE_BYTES_PER_POINT
 
-class CKTable(KTable, InterpolatingOpacity):
+FORTRAN_RECORD = np.dtype([('head', np.int32), ('value', np.float64), ('tail', np.int32)])
+BYTES_PER_POINT = KTABLE_BYTES_PER_POINT
 
-    @classmethod
-    def discover(cls):
-        import os
-        import glob
-        import pathlib
-        from taurex.cache import GlobalCache
-        from taurex.util.util import sanitize_molecule_string
-
-        input_path = None
-        if GlobalCache()['petitrad_path'] is not None:
-            input_path = os.path.join(GlobalCache()['petitrad_path'],'petitRADTRANS','input_data')
-
-        input_path = input_path or GlobalCache()['ktable_path']
-        if input_path is None:
-            return []
-        opacities_path = os.path.join(input_path,'opacities','lines','corr_k')
-        if not os.path.isdir(opacities_path):
-            return []
-        
-        folders = [x for x in glob.glob(os.path.join(opacities_path,'*')) if os.path.isdir(x)] 
-
-        check_molecules = zip([pathlib.Path(x).stem.split('_',1) for x in folders],folders)
-
-        molecule_dict = {}
-
-        main_iso_molecules = [(a,b) for a,b in check_molecules if a[-1]=='main_iso']
-        all_iso_molecules = [(a,b) for a,b in check_molecules if a[-1]=='all_iso']
-
-        for mol,filename in main_iso_molecules:
-            molecule_dict[mol[0]] = filename
-
-        for mol,filename in all_iso_molecules:
-            if mol[0] not in molecule_dict:
-                molecule_dict[mol[0]] = filename
-
-        check_molecules = zip([pathlib.Path(x).stem.split('_',1) for x in folders],folders)
+class CKTable(GridCacheMixin, KTable, InterpolatingOpacity):
 
-        for mol,filename in check_molecules:
-            if len(mol) == 1 and mol[0] not in molecule_dict:
-                molecule_dict[mol[0]] = filename 
-
-
-        return list(molecule_dict.items())
+    cache_loader = 'CKTable'
 
+    @classmethod
+    def discover(cls):
+        return discover_ktables()
 
     def __init__(self, molecule_path, interpolation_mode='linear'):
         super().__init__('[PR]CKTable:{}'.format(pathlib.Path(molecule_path).stem[0:10]),
@@ -60,56 +29,103 @@ class CKTable(KTable, InterpolatingOpacity):
         self._molecule_name = pathlib.Path(molecule_path).stem.split('_',1)[0]
 
         self._determine_grids()
-        self._load_xsec()
+        if not self._load_from_cache():
+            self._load_xsec()
+            self._write_to_cache()
+
+    def _cache_sources(self):
+        import os
+        return [os.path.join(self._molecule_path,'kappa_g_info.dat')] + [s for p,t,s in self._sigma_files]
 
     def _load_xsec(self):
         from taurex.constants import SPDLIGT
+        from taurex.mpi import allocate_as_shared, shared_rank, barrier, shared_comm
         import os
-        from scipy.io import FortranFile
         path_to_kappa = os.path.join(self._molecule_path,'kappa_g_info.dat')
         arr = np.loadtxt(path_to_kappa,skiprows=1)
 
-        self._wavenumber_grid = 10000/((SPDLIGT/arr[::-1,0])*1e6)
-        self._xsec_grid = np.empty(shape=(self._pressure_grid.shape[0], 
-                                          self._temperature_grid.shape[0],
-                                          self._wavenumber_grid.shape[0],len(self.weights)))
-        
-        for p, t, sigma in self._sigma_files:
-            pindex = np.where(self._pressure_grid==p)[0]
-            tindex = np.where(self._temperature_grid==t)[0]
-            read_array = np.fromfile(sigma,dtype=np.int32)
-
-            first_half = read_array[1::4]
-            second_half = read_array[2::4]
-
-            combined = np.empty(shape=(len(first_half)*2),dtype=np.int32)
-
-            combined[0::2] = first_half
-            combined[1::2] = second_half
-
-            xsec = combined.view(np.float64).reshape(-1,16)
-            self._xsec_grid[pindex,tindex,:,:] = xsec[:,:]
+        # Wavenumbers in file order (descending), sigma files share this order
+        file_wavenumber = 10000/((SPDLIGT/arr[:,0])*1e6)
+        if file_wavenumber.shape[0] != self._n_wavenumbers:
+            raise ValueError('{} lists {} wavenumbers but the sigma files hold {}'.format(
+                path_to_kappa, file_wavenumber.shape[0], self._n_wavenumbers))
+
+        clip = clip_range()
+        start, stop = wavenumber_window(file_wavenumber, clip)
+        if stop == start:
+            self.warning('No wavenumbers found in clip range %s', clip)
+
+        self._wavenumber_grid = file_wavenumber[start:stop][::-1].copy()
+        private_grid = np.empty(shape=(self._pressure_grid.shape[0], 
+                                       self._temperature_grid.shape[0],
+                                       self._wavenumber_grid.shape[0],len(self.weights)),
+                                dtype=storage_dtype())
+        self.info('Moving k-table grid to shared memory')
+        barrier()
+        self._xsec_grid = allocate_as_shared(private_grid, logger=self)
+        is_shared = self._xsec_grid is not private_grid
+        del private_grid
 
         num_moles = 1/calculate_weight(self.moleculeName)
 
         num_molecules = num_moles*6.0221409e23
 
-        self._xsec_grid = self._xsec_grid[:, :, ::-1,:]/num_molecules
+        # Split the files across the node only when every rank sees the same grid
+        shared_nprocs = 1
+        rank = 0
+        comm = shared_comm() if is_shared else None
+        if comm is not None:
+            shared_nprocs = comm.Get_size()
+            rank = shared_rank()
+
+        if stop == start:
+            return
+
+        def load_file(entry):
+            p, t, sigma = entry
+            pindex = np.searchsorted(self._pressure_grid, p)
+            tindex = np.searchsorted(self._temperature_grid, t)
+            # Reverse into ascending wavenumber and scale straight into the grid
+            np.divide(self._read_sigma(sigma)[start:stop][::-1], num_molecules,
+                      out=self._xsec_grid[pindex, tindex])
+
+        my_files = [entry for idx, entry in enumerate(self._sigma_files)
+                    if idx % shared_nprocs == rank]
+        run_threaded(load_file, my_files, load_workers())
+        barrier()
+
+    def compute_opacity(self, temperature, pressure, wngrid=None):
+        return super().compute_opacity(temperature, pressure, wngrid).astype(np.float64, copy=False)
+
+    def _read_sigma(self, sigma):
+        """
+        Memory maps a Fortran sigma file and returns a (wn, g) view of
+        the float64 payload with the record markers skipped.
+        """
+        records = np.memmap(sigma, dtype=FORTRAN_RECORD, mode='r')
+        if records.shape[0] > 0 and records['head'][0] != FORTRAN_RECORD['value'].itemsize:
+            raise ValueError('Unexpected Fortran record marker in {}'.format(sigma))
+        return records['value'].reshape(-1, 16)
 
     def _determine_grids(self):
         import os
-        import glob
 
-        sigma_files = glob.glob(os.path.join(self._molecule_path,'sigma_*.dat'))
-        temperature_grid = [float(pathlib.Path(x).stem.split('_')[2][:-1]) for x in sigma_files]
-        pressure_grid = [float(pathlib.Path(x).stem.split('_')[3].split('b')[0])*1e5 for x in sigma_files]
+        entry = folder_entry(self._molecule_path, BYTES_PER_POINT)
+        self._n_wavenumbers = entry['n_wavenumbers']
+        sigma_files = [os.path.join(self._molecule_path, x[2]) for x in entry['sigma_files']]
+        pressure_grid = [x[0] for x in entry['sigma_files']]
+        temperature_grid = [x[1] for x in entry['sigma_files']]
 
         s = sorted(zip(pressure_grid,temperature_grid,sigma_files),key = lambda x:(x[0],x[1]))
         pressure_grid,temperature_grid,sigma_files = list(zip(*s))
 
-        self._pressure_grid = np.unique(np.array(pressure_grid))
-        self._temperature_grid = np.unique(np.array(temperature_grid))
-        self._sigma_files = list(zip(pressure_grid,temperature_grid,sigma_files))
+        pressure_range, temperature_range = grid_ranges()
+        self._pressure_grid = bracket(np.unique(np.array(pressure_grid)), pressure_range)
+        self._temperature_grid = bracket(np.unique(np.array(temperature_grid)), temperature_range)
+        keep_pressures = set(self._pressure_grid)
+        keep_temperatures = set(self._temperature_grid)
+        self._sigma_files = [(p, t, s) for p, t, s in zip(pressure_grid,temperature_grid,sigma_files)
+                             if p in keep_pressures and t in keep_temperatures]
         self._max_pressure = self._pressure_grid.max()
         self._min_pressure = self._pressure_grid.min()
         self._max_temperature = self._temperature_grid.max()
@@ -0,0 +1,84 @@
+"""
+Molecule discovery of the line-by-line and correlated-k readers
+through the opacity index.
+"""
+import os
+import pathlib
+from ..util.index import opacity_index
+
+# Bytes per wavenumber of a sigma file, float64 cross-sections for
+# line-by-line, 16 g-points of Fortran records (int32, float64, int32)
+# for correlated-k
+LINEBYLINE_BYTES_PER_POINT = 8
+KTABLE_BYTES_PER_POINT = 16*16
+
+
+def molecule_folders(path_key, kind, bytes_per_point):
+    """
+    Molecule folders of ``input_data/opacities/lines/<kind>`` under
+    ``petitrad_path`` or the path in [Global] ``path_key``
+    """
+    from taurex.cache import GlobalCache
+
+    input_path = None
+    if GlobalCache()['petitrad_path'] is not None:
+        input_path = os.path.join(GlobalCache()['petitrad_path'],'petitRADTRANS','input_data')
+
+    input_path = input_path or GlobalCache()[path_key]
+    if input_path is None:
+        return []
+    opacities_path = os.path.join(input_path,'opacities','lines',kind)
+    if not os.path.isdir(opacities_path):
+        return []
+
+    index = opacity_index(opacities_path, bytes_per_point)
+    return [os.path.join(opacities_path, x) for x in sorted(index['folders'])]
+
+
+def discover_linebyline():
+    """(molecule, folder) of every line-by-line opacity"""
+    folders = molecule_folders('xsec_path', 'line_by_line', LINEBYLINE_BYTES_PER_POINT)
+
+    check_molecules = zip([pathlib.Path(x).stem.split('_',1) for x in folders],folders)
+
+    molecule_dict = {}
+
+    main_iso_molecules = [(a,b) for a,b in check_molecules if a[-1]=='main_iso']
+
+    for mol,filename in main_iso_molecules:
+        molecule_dict[mol[0]] = filename
+
+    check_molecules = zip([pathlib.Path(x).stem.split('_',1) for x in folders],folders)
+
+    for mol,filename in check_molecules:
+        if len(mol) == 1 and mol[0] not in molecule_dict:
+            molecule_dict[mol[0]] = filename
+
+    return list(molecule_dict.items())
+
+
+def discover_ktables():
+    """(molecule, folder) of every correlated-k opacity"""
+    folders = molecule_folders('ktable_path', 'corr_k', KTABLE_BYTES_PER_POINT)
+
+    check_molecules = zip([pathlib.Path(x).stem.split('_',1) for x in folders],folders)
+
+    molecule_dict = {}
+
+    main_iso_molecules = [(a,b) for a,b in check_molecules if a[-1]=='main_iso']
+    all_iso_molecules = [(a,b) for a,b in check_molecules if a[-1]=='all_iso']
+
+    for mol,filename in main_iso_molecules:
+        molecule_dict[mol[0]] = filename
+
+    for mol,filename in all_iso_molecules:
+        if mol[0] not in molecule_dict:
+            molecule_dict[mol[0]] = filename
+
+    check_molecules = zip([pathlib.Path(x).stem.split('_',1) for x in folders],folders)
+
+    for mol,filename in check_molecules:
+        if len(mol) == 1 and mol[0] not in molecule_dict:
+            molecule_dict[mol[0]] = filename
+
+    return list(molecule_dict.items())
@@ -4,10 +4,19 @@ import numpy as np
 import os
 import pathlib
 from taurex.util.util import calculate_weight
-from taurex.mpi import allocate_as_shared, shared_rank, barrier, shared_comm
+from ..util.gridcache import GridCacheMixin
+from ..util.workers import load_workers, run_threaded
+from ..util.window import clip_range, wavenumber_window, storage_dtype, grid_ranges, bracket
+from ..util.index import folder_entry
+from .discovery import discover_linebyline, LINEBYLINE_BYTES_PER_POINT
+from ..util.resample import resample_options, Resampler
 
+BYTES_PER_POINT = LINEBYLINE_BYTES_PER_POINT
 
-class LineByLine(InterpolatingOpacity):
+
+class LineByLine(GridCacheMixin, InterpolatingOpacity):
+
+    cache_loader = 'LineByLine'
 
     @classmethod
     def priority(cls):
@@ -15,43 +24,7 @@ class LineByLine(InterpolatingOpacity):
 
     @classmethod
     def discover(cls):
-        import os
-        import glob
-        import pathlib
-        from taurex.cache import GlobalCache
-        from taurex.util.util import sanitize_molecule_string
-
-        input_path = None
-        if GlobalCache()['petitrad_path'] is not None:
-            input_path = os.path.join(GlobalCache()['petitrad_path'],'petitRADTRANS','input_data')
-
-        input_path = input_path or GlobalCache()['xsec_path']
-        if input_path is None:
-            return []
-        opacities_path = os.path.join(input_path,'opacities','lines','line_by_line')
-        if not os.path.isdir(opacities_path):
-            return []
-        
-        folders = [x for x in glob.glob(os.path.join(opacities_path,'*')) if os.path.isdir(x)] 
-
-        check_molecules = zip([pathlib.Path(x).stem.split('_',1) for x in folders],folders)
-
-        molecule_dict = {}
-
-        main_iso_molecules = [(a,b) for a,b in check_molecules if a[-1]=='main_iso']
-
-        for mol,filename in main_iso_molecules:
-            molecule_dict[mol[0]] = filename
-
-        check_molecules = zip([pathlib.Path(x).stem.split('_',1) for x in folders],folders)
-
-        for mol,filename in check_molecules:
-            if len(mol) == 1 and mol[0] not in molecule_dict:
-                molecule_dict[mol[0]] = filename 
-
-
-        return list(molecule_dict.items())
-
+        return discover_linebyline()
 
     def __init__(self, molecule_path, interpolation_mode='linear'):
         super().__init__('[PR]LineByLineOpacity:{}'.format(pathlib.Path(molecule_path).stem[0:10]),
@@ -62,77 +35,127 @@ class LineByLine(InterpolatingOpacity):
         self._molecule_name = pathlib.Path(molecule_path).stem.split('_',1)[0]
         
         self._determine_grids()
-        self._load_xsec_from_path()
-
-    def _load_xsec_from_path(self):
-        from taurex.cache import GlobalCache
-        wavenumber_range = GlobalCache()['petitrad_wnclip']
-        wavelength_range = GlobalCache()['petitrad_wlclip']
-
-
-        wn_filter = slice(None)
+        if not self._load_from_cache():
+            self._load_xsec_from_path()
+            self._write_to_cache()
 
+    def _cache_sources(self):
+        return [os.path.join(self._molecule_path,'wlen.dat')] + [s for p,t,s in self._sigma_files]
 
-        self._wavenumber_grid = 10000/(np.fromfile(os.path.join(self._molecule_path,'wlen.dat'))[::-1]*1e4)
-        if wavenumber_range is not None:
-            min_wn = min(wavenumber_range)
-            max_wn = max(wavenumber_range)
-            wn_filter = (self._wavenumber_grid >= min_wn) & (self._wavenumber_grid <= max_wn)
-        if wavelength_range is not None:
-            wn = [10000/x for x in wavelength_range]
-            min_wn = min(wn)
-            max_wn = max(wn)
-            wn_filter = (self._wavenumber_grid >= min_wn) & (self._wavenumber_grid <= max_wn)
+    def _cache_parameters(self):
+        parameters = super()._cache_parameters()
+        parameters['resample'] = resample_options()
+        return parameters
 
-
-        self._wavenumber_grid =self._wavenumber_grid[wn_filter]
-
-        self._xsec_grid = np.empty(shape=(self._pressure_grid.shape[0], 
-                                          self._temperature_grid.shape[0],
-                                          self._wavenumber_grid.shape[0]))
-        self.info('GONNA PUT THIS BAD BOY IN SHARED')
+    def _load_xsec_from_path(self):
+        from taurex.cache import GlobalCache
+        from taurex.mpi import allocate_as_shared, shared_rank, barrier, shared_comm
+        use_mmap = GlobalCache()['petitrad_mmap']
+
+        # Wavenumbers in file order (descending), sigma files share this order
+        path_to_wlen = os.path.join(self._molecule_path,'wlen.dat')
+        file_wavenumber = 10000/(np.fromfile(path_to_wlen)*1e4)
+        if file_wavenumber.shape[0] != self._n_wavenumbers:
+            raise ValueError('{} lists {} wavenumbers but the sigma files hold {}'.format(
+                path_to_wlen, file_wavenumber.shape[0], self._n_wavenumbers))
+
+        clip = clip_range()
+        start, stop = wavenumber_window(file_wavenumber, clip)
+        if stop == start:
+            self.warning('No wavenumbers found in clip range %s', clip)
+
+        self._wavenumber_grid = file_wavenumber[start:stop][::-1].copy()
+        del file_wavenumber
+
+        resampler = None
+        options = resample_options()
+        if options is not None and stop > start:
+            resampler = Resampler(self._wavenumber_grid, options)
+            self.info('Resampling %s native points to %s (%s)', self._wavenumber_grid.shape[0],
+                      resampler.wavenumberGrid.shape[0], resampler.mode)
+            self._wavenumber_grid = resampler.wavenumberGrid
+
+        private_grid = np.empty(shape=(self._pressure_grid.shape[0], 
+                                       self._temperature_grid.shape[0],
+                                       self._wavenumber_grid.shape[0]),
+                                dtype=storage_dtype())
+        self.info('Moving cross-section grid to shared memory')
         barrier()
-        self._xsec_grid = allocate_as_shared(self._xsec_grid, logger=self)
+        self._xsec_grid = allocate_as_shared(private_grid, logger=self)
+        is_shared = self._xsec_grid is not private_grid
+        del private_grid
 
         num_moles = 1/calculate_weight(self.moleculeName)
 
         num_molecules = num_moles*6.0221409e23
         self.info('Number of molecules per gram: %s', num_molecules)
-        self.info('OK NOW ACTUALLY LOADING')
+        self.info('Reading wavenumber window %s-%s of %s', start, stop, self._molecule_path)
 
-        shared_comm = shared_comm()
+        # Split the files across the node only when every rank sees the same grid
         shared_nprocs = 1
-        if shared_comm is not None:
-            shared_nprocs = shared_comm.Get_size()
-        
-        
-        for idx,(p, t, sigma) in enumerate(self._sigma_files):
-            if idx % shared_nprocs == shared_rank():
-                pindex = np.where(self._pressure_grid==p)[0]
-                tindex = np.where(self._temperature_grid==t)[0]
-
-                arr = np.fromfile(sigma)[::-1]/num_molecules
-
+        rank = 0
+        comm = shared_comm() if is_shared else None
+        if comm is not None:
+            shared_nprocs = comm.Get_size()
+            rank = shared_rank()
+
+        if stop == start:
+            return
+
+        def load_file(entry):
+            p, t, sigma = entry
+            pindex = np.searchsorted(self._pressure_grid, p)
+            tindex = np.searchsorted(self._temperature_grid, t)
+
+            arr = self._read_sigma_window(sigma, start, stop, use_mmap)
+            data = arr[::-1]
+            if resampler is not None:
+                data = resampler(data)
+
+            np.divide(data, num_molecules, out=self._xsec_grid[pindex, tindex])
+            del arr, data
+
+        my_files = [entry for idx, entry in enumerate(self._sigma_files)
+                    if idx % shared_nprocs == rank]
+        run_threaded(load_file, my_files, load_workers())
+        barrier()
 
-                self._xsec_grid[pindex, tindex,:] = arr[wn_filter]
-        
+    def compute_opacity(self, temperature, pressure, wngrid=None):
+        return super().compute_opacity(temperature, pressure, wngrid).astype(np.float64, copy=False)
+
+    def _read_sigma_window(self, sigma, start, stop, use_mmap=False):
+        """
+        Reads only the ``start:stop`` section of a sigma file either through
+        a memory map or a single offset read.
+        """
+        itemsize = np.dtype(np.float64).itemsize
+        if use_mmap:
+            return np.memmap(sigma, dtype=np.float64, mode='r',
+                             offset=start*itemsize, shape=(stop-start,))
+        return np.fromfile(sigma, dtype=np.float64, count=stop-start,
+                           offset=start*itemsize)
     
     def _determine_grids(self):
         import os
-        import glob
 
-        sigma_files = glob.glob(os.path.join(self._molecule_path,'sigma_*.dat'))
-        temperature_grid = [float(pathlib.Path(x).stem.split('_')[2][:-1]) for x in sigma_files]
-        pressure_grid = [float(pathlib.Path(x).stem.split('_')[3].split('b')[0])*1e5 for x in sigma_files]
+        entry = folder_entry(self._molecule_path, BYTES_PER_POINT)
+        self._n_wavenumbers = entry['n_wavenumbers']
+        sigma_files = [os.path.join(self._molecule_path, x[2]) for x in entry['sigma_files']]
+        pressure_grid = [x[0] for x in entry['sigma_files']]
+        temperature_grid = [x[1] for x in entry['sigma_files']]
 
         #print([pathlib.Path(x).stem.split('_')[3].split('b')[0] for x in sigma_files])
 
         s = sorted(zip(pressure_grid,temperature_grid,sigma_files),key = lambda x:(x[0],x[1]))
         pressure_grid,temperature_grid,sigma_files = list(zip(*s))
 
-        self._pressure_grid = np.unique(np.array(pressure_grid))
-        self._temperature_grid = np.unique(np.array(temperature_grid))
-        self._sigma_files = list(zip(pressure_grid,temperature_grid,sigma_files))
+        pressure_range, temperature_range = grid_ranges()
+        self._pressure_grid = bracket(np.unique(np.array(pressure_grid)), pressure_range)
+        self._temperature_grid = bracket(np.unique(np.array(temperature_grid)), temperature_range)
+        keep_pressures = set(self._pressure_grid)
+        keep_temperatures = set(self._temperature_grid)
+        self._sigma_files = [(p, t, s) for p, t, s in zip(pressure_grid,temperature_grid,sigma_files)
+                             if p in keep_pressures and t in keep_temperatures]
         self._max_pressure = self._pressure_grid.max()
         self._min_pressure = self._pressure_grid.min()
         self._max_temperature = self._temperature_grid.max()
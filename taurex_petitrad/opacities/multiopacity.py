@@ -0,0 +1,241 @@
+import numpy as np
+
+CHUNK_BYTES = 4*1024*1024
+
+
+def normalise_filter(wngrid_filter):
+    """Wavenumber filter as a slice or an index array"""
+    if wngrid_filter is None:
+        return slice(None)
+    if isinstance(wngrid_filter, slice):
+        return wngrid_filter
+    wngrid_filter = np.asarray(wngrid_filter)
+    if wngrid_filter.dtype == np.bool_:
+        return np.flatnonzero(wngrid_filter)
+    return wngrid_filter
+
+
+def output_shape(xsec, wngrid_filter):
+    """Shape of the opacity of one layer of ``xsec`` after filtering"""
+    return np.empty(xsec.shape[2:], dtype=np.bool_)[normalise_filter(wngrid_filter)].shape
+
+
+class InterpolationWeights:
+    """
+    Bracketing grid indices and bilinear weights of every layer of a
+    profile on one (pressure, temperature) grid, reproducing the edge
+    handling of :class:`~taurex.opacity.interpolateopacity.InterpolatingOpacity`:
+
+    - above both maxima the last grid point is used
+    - below both minima the opacity is zero
+    - above or below one axis only the other axis is interpolated
+      (extrapolating if also outside of it)
+
+    Parameters
+    ----------
+    temperature_grid: :obj:`array`
+        Ascending temperature grid in K
+    pressure_grid: :obj:`array`
+        Ascending pressure grid in Pa
+    temperature: :obj:`array`
+        Temperature of each layer in K
+    pressure: :obj:`array`
+        Pressure of each layer in Pa
+
+    """
+
+    def __init__(self, temperature_grid, pressure_grid, temperature, pressure):
+        log_pressure_grid = np.log10(pressure_grid)
+        temperature = np.asarray(temperature, dtype=np.float64)
+        log_pressure = np.log10(np.asarray(pressure, dtype=np.float64))
+
+        t_max = np.clip(temperature_grid.searchsorted(temperature), 1, temperature_grid.shape[0] - 1)
+        t_min = t_max - 1
+        p_max = np.clip(log_pressure_grid.searchsorted(log_pressure), 1, log_pressure_grid.shape[0] - 1)
+        p_min = p_max - 1
+
+        above_pressure = log_pressure >= log_pressure_grid.max()
+        above_temperature = temperature >= temperature_grid.max()
+        below_pressure = log_pressure < log_pressure_grid.min()
+        below_temperature = temperature < temperature_grid.min()
+
+        # Same order of checks as InterpolatingOpacity.interp_bilinear_grid
+        corner = above_pressure & above_temperature
+        zero = below_pressure & below_temperature
+        remaining = ~corner & ~zero
+        temperature_only = above_pressure & remaining
+        pressure_only = above_temperature & remaining
+        remaining &= ~(temperature_only | pressure_only)
+        temperature_only |= below_pressure & remaining
+        pressure_only |= below_temperature & remaining
+
+        # Collapse the pressure (temperature) axis on the edge row (column)
+        edge_pressure = np.where(above_pressure, log_pressure_grid.shape[0] - 1, 0)
+        p_min = np.where(temperature_only | corner, edge_pressure, p_min)
+        p_max = np.where(temperature_only | corner, edge_pressure, p_max)
+        edge_temperature = np.where(above_temperature, temperature_grid.shape[0] - 1, 0)
+        t_min = np.where(pressure_only | corner, edge_temperature, t_min)
+        t_max = np.where(pressure_only | corner, edge_temperature, t_max)
+
+        pressure_scale = (log_pressure - log_pressure_grid[p_min]) / \
+            np.where(p_max != p_min, log_pressure_grid[p_max] - log_pressure_grid[p_min], 1.0)
+        pressure_scale[p_max == p_min] = 0.0
+        temperature_scale = (temperature - temperature_grid[t_min]) / \
+            np.where(t_max != t_min, temperature_grid[t_max] - temperature_grid[t_min], 1.0)
+        temperature_scale[t_max == t_min] = 0.0
+
+        self.p_min = p_min
+        self.p_max = p_max
+        self.t_min = t_min
+        self.t_max = t_max
+        self.pressure_scale = pressure_scale
+        self.temperature_scale = temperature_scale
+        self.zero = zero
+        self.exp_layers = ~(pressure_only | corner | zero)
+        self.temperature = temperature
+        self.temperature_grid = temperature_grid
+
+        # Corners ordered (p_min, t_min), (p_min, t_max), (p_max, t_min), (p_max, t_max)
+        self._p_corners = np.stack([p_min, p_min, p_max, p_max], axis=1)
+        self._t_corners = np.stack([t_min, t_max, t_min, t_max], axis=1)
+        self._weights = np.stack([(1 - pressure_scale)*(1 - temperature_scale),
+                                  (1 - pressure_scale)*temperature_scale,
+                                  pressure_scale*(1 - temperature_scale),
+                                  pressure_scale*temperature_scale], axis=1)
+        self._weights[zero] = 0.0
+
+    @property
+    def nLayers(self):
+        return self.temperature.shape[0]
+
+    def _gather(self, xsec, layers, wngrid_filter):
+        p_index = self._p_corners[layers]
+        t_index = self._t_corners[layers]
+        if isinstance(wngrid_filter, slice):
+            return xsec[p_index, t_index, wngrid_filter]
+        return xsec[p_index[..., None], t_index[..., None], wngrid_filter[None, None, :]]
+
+    def apply(self, xsec, interpolation_mode='linear', wngrid_filter=None, out=None):
+        """
+        Interpolates an opacity cube of shape (n_pressure, n_temperature,
+        n_wavenumber[, n_g]) to every layer. Layers are processed a few
+        at a time so the gathered grid points stay in cache.
+
+        Returns
+        -------
+        :obj:`array`
+            (n_layers, n_wavenumber[, n_g]) without the 1/10000 factor
+        """
+        if interpolation_mode not in ('linear', 'exp', ):
+            raise ValueError('Unknown interpolation mode {}'.format(interpolation_mode))
+
+        wngrid_filter = normalise_filter(wngrid_filter)
+        point_shape = output_shape(xsec, wngrid_filter)
+        if out is None:
+            out = np.empty((self.nLayers, ) + point_shape, dtype=np.float64)
+
+        point_bytes = 4*max(int(np.prod(point_shape)), 1)*xsec.dtype.itemsize
+        chunk = max(1, CHUNK_BYTES//point_bytes)
+
+        for start in range(0, self.nLayers, chunk):
+            layers = slice(start, start + chunk)
+            corners = self._gather(xsec, layers, wngrid_filter)
+            if interpolation_mode == 'linear':
+                np.einsum('lc,lc...->l...', self._weights[layers], corners, out=out[layers])
+                continue
+
+            shape = (-1, ) + (1, )*(corners.ndim - 2)
+            pressure_scale = self.pressure_scale[layers].reshape(shape)
+            temperature_scale = self.temperature_scale[layers].reshape(shape)
+            low = corners[:, 0]*(1 - pressure_scale) + corners[:, 2]*pressure_scale
+            high = corners[:, 1]*(1 - pressure_scale) + corners[:, 3]*pressure_scale
+            result = low + (high - low)*temperature_scale
+
+            exp_layers = self.exp_layers[layers]
+            if np.any(exp_layers):
+                temperature = self.temperature[layers][exp_layers].reshape(shape)
+                t_min = self.temperature_grid[self.t_min[layers][exp_layers]].reshape(shape)
+                t_max = self.temperature_grid[self.t_max[layers][exp_layers]].reshape(shape)
+                low = low[exp_layers]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    result[exp_layers] = low*np.exp(t_max*(-temperature + t_min)*np.log(low/high[exp_layers]) /
+                                                    (temperature*(t_max - t_min)))
+            result[self.zero[layers]] = 0.0
+            out[layers] = result
+
+        return out
+
+
+class MultiOpacity:
+    """
+    Interpolates several petitRADTRANS opacities to a whole profile at
+    once. The bracketing indices and weights are computed once for each
+    distinct (pressure, temperature) grid and applied to every molecule
+    with a vectorised gather over all layers.
+
+    Parameters
+    ----------
+    opacities: list
+        :class:`~taurex_petitrad.opacities.linebyline.LineByLine` or
+        :class:`~taurex_petitrad.opacities.ck.CKTable` objects with the
+        same wavenumber grid
+
+    """
+
+    def __init__(self, opacities):
+        self._opacities = list(opacities)
+        if len(self._opacities) == 0:
+            raise ValueError('No opacities given')
+        shapes = set(x.xsecGrid.shape[2:] for x in self._opacities)
+        if len(shapes) > 1:
+            raise ValueError('Opacities have different wavenumber grids {}'.format(shapes))
+
+    @property
+    def moleculeNames(self):
+        return [x.moleculeName for x in self._opacities]
+
+    @property
+    def wavenumberGrid(self):
+        return self._opacities[0].wavenumberGrid
+
+    def interpolation_weights(self, temperature, pressure):
+        """
+        :class:`InterpolationWeights` of each opacity, shared between
+        opacities on the same grid
+        """
+        weights = {}
+        result = []
+        for opacity in self._opacities:
+            key = (opacity.temperatureGrid.tobytes(), opacity.pressureGrid.tobytes())
+            if key not in weights:
+                weights[key] = InterpolationWeights(opacity.temperatureGrid, opacity.pressureGrid,
+                                                    temperature, pressure)
+            result.append(weights[key])
+        return result
+
+    def compute_opacities(self, temperature, pressure, wngrid=None):
+        """
+        Opacities of every molecule at every layer, equivalent to
+        calling ``compute_opacity`` of each opacity for each layer
+
+        Parameters
+        ----------
+        temperature: :obj:`array`
+            Temperature of each layer in K
+        pressure: :obj:`array`
+            Pressure of each layer in Pa
+        wngrid: :obj:`array`, optional
+            Wavenumber filter (boolean mask, indices or slice)
+
+        Returns
+        -------
+        :obj:`array`
+            (n_molecules, n_layers, n_wavenumber[, n_g])
+        """
+        weights = self.interpolation_weights(temperature, pressure)
+        out = np.empty((len(self._opacities), weights[0].nLayers) +
+                       output_shape(self._opacities[0].xsecGrid, wngrid), dtype=np.float64)
+        for index, (opacity, weight) in enumerate(zip(self._opacities, weights)):
+            weight.apply(opacity.xsecGrid, opacity._interp_mode, wngrid, out=out[index])
+        out /= 10000
+        return out
@@ -0,0 +1,95 @@
+from taurex.log import Logger
+
+
+class OpacityPrefetcher(Logger):
+    """
+    Loads the :class:`~taurex_petitrad.opacities.linebyline.LineByLine`
+    or :class:`~taurex_petitrad.opacities.ck.CKTable` opacities of several
+    molecules on background threads. Loading starts on construction and
+    only the molecules asked for through ``prefetcher[molecule]`` are
+    waited for, so setup can continue while the rest are read.
+
+    Under MPI the molecules are instead loaded on construction, one
+    after another in the given order and on the calling thread, since
+    the shared memory allocations are MPI calls that every rank must
+    make in the same order from its main thread.
+
+    Parameters
+    ----------
+    molecules: list
+        Molecules to load, in order of need
+    klass: class, optional
+        Opacity class, :class:`LineByLine` by default
+    workers: int, optional
+        Number of molecules loaded at once, set through
+        ``petitrad_prefetch_workers`` in [Global], defaults to 2
+
+    """
+
+    def __init__(self, molecules, klass=None, workers=None):
+        super().__init__(self.__class__.__name__)
+        from concurrent.futures import ThreadPoolExecutor, Future
+        from taurex.cache import GlobalCache
+        from taurex.mpi import nprocs
+
+        if klass is None:
+            from .linebyline import LineByLine
+            klass = LineByLine
+
+        paths = dict(klass.discover())
+        missing = [x for x in molecules if x not in paths]
+        if len(missing) > 0:
+            self.warning('No %s opacities found for %s', klass.__name__, missing)
+
+        self._executor = None
+        self._futures = {}
+        if nprocs() > 1:
+            for molecule in molecules:
+                if molecule in paths and molecule not in self._futures:
+                    self._futures[molecule] = Future()
+                    self._futures[molecule].set_result(klass(paths[molecule]))
+            self.info('Loaded %s', list(self._futures))
+            return
+
+        workers = workers or GlobalCache()['petitrad_prefetch_workers'] or 2
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)))
+        for molecule in molecules:
+            if molecule in paths and molecule not in self._futures:
+                self._futures[molecule] = self._executor.submit(klass, paths[molecule])
+        self.info('Prefetching %s', list(self._futures))
+
+    @property
+    def molecules(self):
+        return list(self._futures)
+
+    def __contains__(self, molecule):
+        return molecule in self._futures
+
+    def __getitem__(self, molecule):
+        """Opacity of ``molecule``, waiting for it if still loading"""
+        future = self._futures[molecule]
+        if not future.done():
+            self.info('Waiting for %s', molecule)
+        return future.result()
+
+    def done(self, molecule):
+        return self._futures[molecule].done()
+
+    def install(self, molecules=None):
+        """
+        Adds the opacities to the TauREx :class:`~taurex.cache.OpacityCache`,
+        waiting for each in turn
+        """
+        from taurex.cache import OpacityCache
+        for molecule in molecules or self.molecules:
+            OpacityCache().add_opacity(self[molecule])
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
@@ -0,0 +1,194 @@
+import os
+import json
+import socket
+import hashlib
+import pathlib
+import numpy as np
+
+CACHE_VERSION = 1
+
+
+def source_signature(files):
+    """
+    Returns a list of (name, mtime, size) for each source file so
+    that a cache can be invalidated when any of them change.
+    """
+    signature = []
+    for f in files:
+        stat = os.stat(f)
+        signature.append([os.path.basename(f), stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def cache_prefix(cache_path, molecule_path, parameters):
+    """
+    Builds the file prefix for a molecule folder loaded with
+    ``parameters``.
+    """
+    key = json.dumps({'path': os.path.abspath(molecule_path),
+                      'parameters': parameters}, sort_keys=True)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    name = pathlib.Path(molecule_path).name
+    return os.path.join(cache_path, '{}-{}'.format(name, digest))
+
+
+def load_grid(cache_path, molecule_path, files, parameters, validate=True):
+    """
+    Opens a cached opacity grid.
+
+    Parameters
+    ----------
+    validate: bool
+        Checks the cache version and source files, skipped when another
+        process has already validated the cache
+
+    Returns
+    -------
+    dict or None
+        ``pressure``, ``temperature`` and ``wavenumber`` grids and
+        the cross-section grid as a read-only memory map.
+        ``None`` if no cache exists or it is out of date.
+    """
+    prefix = cache_prefix(cache_path, molecule_path, parameters)
+    header_path = prefix + '.json'
+    if not os.path.isfile(header_path):
+        return None
+    try:
+        with open(header_path, 'r') as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if validate:
+        if header.get('version') != CACHE_VERSION:
+            return None
+        if header.get('sources') != source_signature(files):
+            return None
+
+    try:
+        wavenumber = np.load(prefix + '.wngrid.npy')
+        xsec = np.load(prefix + '.xsec.npy', mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+    return {'pressure': np.array(header['pressure']),
+            'temperature': np.array(header['temperature']),
+            'wavenumber': wavenumber,
+            'xsec': xsec}
+
+
+def _tmp_name(path):
+    return '{}.{}-{}.tmp'.format(path, socket.gethostname(), os.getpid())
+
+
+def _atomic_save(path, array):
+    tmp_path = _tmp_name(path)
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def save_grid(cache_path, molecule_path, files, parameters,
+              pressure, temperature, wavenumber, xsec):
+    """
+    Writes an opacity grid into the cache. The header is written last
+    so a partially written cache is never picked up.
+    """
+    os.makedirs(cache_path, exist_ok=True)
+    prefix = cache_prefix(cache_path, molecule_path, parameters)
+
+    _atomic_save(prefix + '.xsec.npy', np.ascontiguousarray(xsec))
+    _atomic_save(prefix + '.wngrid.npy', np.asarray(wavenumber))
+
+    header = {'version': CACHE_VERSION,
+              'molecule_path': os.path.abspath(molecule_path),
+              'parameters': parameters,
+              'sources': source_signature(files),
+              'pressure': [float(x) for x in pressure],
+              'temperature': [float(x) for x in temperature],
+              'shape': list(xsec.shape)}
+
+    tmp_path = _tmp_name(prefix + '.json')
+    with open(tmp_path, 'w') as f:
+        json.dump(header, f)
+    os.replace(tmp_path, prefix + '.json')
+
+
+class GridCacheMixin:
+    """
+    Loading and saving of an opacity class's cross-section grid through
+    ``petitrad_cache_path`` in [Global]. Classes provide
+    ``_cache_sources()``, the files the grid is read from, and may add
+    loader options to :func:`_cache_parameters`.
+    """
+
+    cache_loader = None
+
+    def _cache_sources(self):
+        raise NotImplementedError
+
+    def _cache_parameters(self):
+        from .window import clip_range, storage_dtype, grid_ranges
+        clip = clip_range()
+        pressure_range, temperature_range = grid_ranges()
+        def to_list(x):
+            return None if x is None else [float(v) for v in x]
+        return {'loader': self.cache_loader,
+                'clip': to_list(clip),
+                'dtype': np.dtype(storage_dtype()).name,
+                'pressure_range': to_list(pressure_range),
+                'temperature_range': to_list(temperature_range)}
+
+    def _load_from_cache(self):
+        from taurex.cache import GlobalCache
+        from taurex.mpi import allocate_as_shared, shared_rank, barrier, broadcast, get_rank
+        cache_path = GlobalCache()['petitrad_cache_path']
+        if cache_path is None:
+            return False
+
+        # The first process decides for every process so that they all
+        # take the same (collective) loading path
+        cached = None
+        if get_rank() == 0:
+            cached = load_grid(cache_path, self._molecule_path, self._cache_sources(),
+                               self._cache_parameters())
+        if not broadcast(cached is not None):
+            self.info('No valid cache found in %s', cache_path)
+            return False
+        if cached is None:
+            cached = load_grid(cache_path, self._molecule_path, self._cache_sources(),
+                               self._cache_parameters(), validate=False)
+            if cached is None:
+                raise IOError('Cache of {} in {} could not be opened'.format(
+                    self._molecule_path, cache_path))
+
+        self.info('Loading cached grid from %s', cache_path)
+        self._pressure_grid = cached['pressure']
+        self._temperature_grid = cached['temperature']
+        self._wavenumber_grid = cached['wavenumber']
+
+        if GlobalCache()['petitrad_mmap']:
+            self._xsec_grid = cached['xsec']
+        else:
+            private_grid = np.empty(shape=cached['xsec'].shape, dtype=cached['xsec'].dtype)
+            barrier()
+            self._xsec_grid = allocate_as_shared(private_grid, logger=self)
+            if self._xsec_grid is private_grid or shared_rank() == 0:
+                np.copyto(self._xsec_grid, cached['xsec'])
+            del private_grid
+            barrier()
+        return True
+
+    def _write_to_cache(self):
+        from taurex.cache import GlobalCache
+        from .workers import node_rank
+        cache_path = GlobalCache()['petitrad_cache_path']
+        if cache_path is None or node_rank() != 0:
+            return
+        self.info('Writing grid to cache %s', cache_path)
+        try:
+            save_grid(cache_path, self._molecule_path, self._cache_sources(),
+                      self._cache_parameters(), self._pressure_grid,
+                      self._temperature_grid, self._wavenumber_grid, self._xsec_grid)
+        except OSError as e:
+            self.warning('Could not write cache to %s: %s', cache_path, e)
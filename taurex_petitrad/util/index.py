@@ -0,0 +1,162 @@
+"""
+Persistent index of a petitRADTRANS opacity folder so that molecule
+folders and sigma file grids do not have to be globbed and parsed
+at every start.
+"""
+import os
+import json
+import pathlib
+import socket
+
+INDEX_NAME = '.taurex_petitrad_index.json'
+INDEX_VERSION = 2
+
+_indexes = {}
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _molecule_folders(opacities_path):
+    return sorted(x for x in os.listdir(opacities_path)
+                  if os.path.isdir(os.path.join(opacities_path, x)))
+
+
+def parse_sigma_name(filename):
+    """
+    Pressure (Pa) and temperature (K) of a petitRADTRANS sigma file
+    named ``sigma_<..>_<T>K_<P>bar.dat``
+    """
+    stem = pathlib.Path(filename).stem.split('_')
+    temperature = float(stem[2][:-1])
+    pressure = float(stem[3].split('b')[0])*1e5
+    return pressure, temperature
+
+
+def scan_folder(folder, bytes_per_point):
+    """
+    Builds the index entry of a single molecule folder.
+
+    Parameters
+    ----------
+    folder: str
+        Molecule folder
+    bytes_per_point: int
+        Size of one wavenumber point in a sigma file, used to
+        derive the native wavenumber grid size
+
+    """
+    names = [x for x in os.listdir(folder) if x.startswith('sigma_') and x.endswith('.dat')]
+    sigma_files = sorted([list(parse_sigma_name(x)) + [x] for x in names],
+                         key=lambda x: (x[0], x[1]))
+    n_wavenumbers = None
+    if len(sigma_files) > 0:
+        n_wavenumbers = os.path.getsize(os.path.join(folder, sigma_files[0][2]))//bytes_per_point
+
+    return {'stamp': _stamp(folder),
+            'sigma_files': sigma_files,
+            'n_wavenumbers': n_wavenumbers}
+
+
+def _read_index(path):
+    try:
+        with open(path, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get('version') != INDEX_VERSION:
+        return None
+    return index
+
+
+def _write_index(path, index):
+    tmp_path = '{}.{}-{}.tmp'.format(path, socket.gethostname(), os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        return False
+    return True
+
+
+def _index_locations(opacities_path):
+    from taurex.cache import GlobalCache
+    import hashlib
+    locations = []
+    cache_path = GlobalCache()['petitrad_cache_path']
+    if cache_path is not None:
+        digest = hashlib.sha1(os.path.abspath(opacities_path).encode('utf-8')).hexdigest()[:16]
+        locations.append(os.path.join(cache_path, 'index-{}.json'.format(digest)))
+    locations.append(os.path.join(opacities_path, INDEX_NAME))
+    return locations
+
+
+def opacity_index(opacities_path, bytes_per_point):
+    """
+    Returns the index of an opacity folder such as
+    ``input_data/opacities/lines/line_by_line``.
+
+    The index is kept in memory and on disk in ``petitrad_cache_path``
+    if set, next to the opacities otherwise. Only the list of molecule
+    folders and the modification stamp of each are checked, molecule
+    folders that changed are rescanned. The list is compared rather than
+    the stamp of the opacity folder itself, which changes whenever the
+    index is written there. Only the first MPI rank writes the index.
+    """
+    from taurex.mpi import get_rank
+    opacities_path = os.path.abspath(opacities_path)
+    index = _indexes.get(opacities_path)
+
+    locations = _index_locations(opacities_path)
+    if index is None:
+        for location in locations:
+            index = _read_index(location)
+            if index is not None:
+                break
+
+    if index is None:
+        index = {'version': INDEX_VERSION, 'folders': {}}
+
+    changed = False
+    names = _molecule_folders(opacities_path)
+    folders = index['folders']
+    if sorted(folders) != names:
+        folders = {k: v for k, v in folders.items() if k in names}
+        for name in names:
+            folders.setdefault(name, None)
+        changed = True
+
+    for name, entry in folders.items():
+        folder = os.path.join(opacities_path, name)
+        if entry is None or entry['stamp'] != _stamp(folder):
+            folders[name] = scan_folder(folder, bytes_per_point)
+            changed = True
+
+    index['folders'] = folders
+    _indexes[opacities_path] = index
+
+    if changed and get_rank() == 0:
+        for location in locations:
+            if _write_index(location, index):
+                break
+
+    return index
+
+
+def folder_entry(molecule_path, bytes_per_point):
+    """
+    Index entry of a molecule folder. Uses an already loaded index of the
+    parent folder when it is up to date, otherwise scans the folder.
+    """
+    molecule_path = os.path.abspath(molecule_path)
+    parent, name = os.path.split(molecule_path)
+    index = _indexes.get(parent)
+    if index is not None:
+        entry = index['folders'].get(name)
+        if entry is not None and entry['stamp'] == _stamp(molecule_path):
+            return entry
+    return scan_folder(molecule_path, bytes_per_point)
@@ -0,0 +1,142 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Least-recently-used mapping bounded by a number of entries
+    and optionally by the total size of the stored values. Safe to
+    use from several threads.
+
+    Parameters
+    ----------
+    max_entries: int
+        Maximum number of entries, 0 disables storage
+    max_bytes: int, optional
+        Maximum total size as given by ``sizeof``
+    sizeof: function, optional
+        Returns the size of a value, required with ``max_bytes``
+
+    """
+
+    def __init__(self, max_entries=16, max_bytes=None, sizeof=None):
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def resize(self, max_entries=None, max_bytes=None):
+        """Changes the bounds, evicting entries if needed"""
+        with self._lock:
+            if max_entries is not None:
+                self._max_entries = max_entries
+            if max_bytes is not None:
+                self._max_bytes = max_bytes
+            self._evict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = 0
+        if self._sizeof is not None:
+            size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if self._max_entries <= 0 or (self._max_bytes is not None and size > self._max_bytes):
+                return
+            self._data[key] = value
+            self._sizes[key] = size
+            self._nbytes += size
+            self._evict()
+
+    def _remove(self, key):
+        del self._data[key]
+        self._nbytes -= self._sizes.pop(key)
+
+    def _evict(self):
+        while len(self._data) > max(self._max_entries, 0) or \
+                (self._max_bytes is not None and self._nbytes > self._max_bytes):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._data),
+                    'bytes': self._nbytes,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions}
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+def digest(*values):
+    """
+    Hash of arrays, scalars and nested dicts/lists/tuples of them
+    usable as an :class:`LRUCache` key
+    """
+    import hashlib
+    import numpy as np
+
+    h = hashlib.blake2b(digest_size=20)
+
+    def update(value):
+        if isinstance(value, np.ndarray):
+            h.update('{}{}'.format(value.dtype.str, value.shape).encode('utf-8'))
+            h.update(np.ascontiguousarray(value).tobytes())
+        elif isinstance(value, dict):
+            h.update(b'{')
+            for key in sorted(value):
+                update(key)
+                update(value[key])
+            h.update(b'}')
+        elif isinstance(value, (list, tuple)):
+            h.update(b'(')
+            for item in value:
+                update(item)
+            h.update(b')')
+        else:
+            h.update(repr(value).encode('utf-8'))
+        h.update(b';')
+
+    for value in values:
+        update(value)
+    return h.digest()
@@ -0,0 +1,118 @@
+import numpy as np
+
+
+def resample_options():
+    """
+    Resampling requested through [Global]:
+
+    - ``petitrad_resolution``: target resolving power R
+    - ``petitrad_wngrid``: target wavenumber grid, takes priority over R
+    - ``petitrad_resample_mode``: ``sample`` (default) picks the nearest
+      native point, ``bin`` averages the native points in each bin
+
+    Returns
+    -------
+    dict or None
+        ``None`` if no resampling is requested
+    """
+    from taurex.cache import GlobalCache
+    resolution = GlobalCache()['petitrad_resolution']
+    wngrid = GlobalCache()['petitrad_wngrid']
+    mode = GlobalCache()['petitrad_resample_mode'] or 'sample'
+
+    if resolution is None and wngrid is None:
+        return None
+
+    mode = mode.strip().lower()
+    if mode not in ('sample', 'bin', ):
+        raise ValueError('Unknown petitrad_resample_mode {}, '
+                         'use sample or bin'.format(mode))
+
+    options = {'mode': mode, 'resolution': None, 'wngrid': None}
+    if wngrid is not None:
+        options['wngrid'] = [float(x) for x in np.sort(np.asarray(wngrid, dtype=np.float64))]
+    else:
+        options['resolution'] = float(resolution)
+    return options
+
+
+def target_grid(native, options):
+    """Target wavenumber grid within the range of the ascending ``native`` grid"""
+    if options['wngrid'] is not None:
+        wngrid = np.array(options['wngrid'])
+        return wngrid[(wngrid >= native[0]) & (wngrid <= native[-1])]
+
+    resolution = options['resolution']
+    npoints = int(np.floor(np.log(native[-1]/native[0])*resolution)) + 1
+    return native[0]*np.exp(np.arange(npoints)/resolution)
+
+
+class Resampler:
+    """
+    Maps spectra on an ascending native wavenumber grid to a
+    coarser grid, either by opacity sampling or bin averaging.
+
+    Parameters
+    ----------
+    native: :obj:`array`
+        Ascending native wavenumber grid
+    options: dict
+        Options from :func:`resample_options`
+
+    """
+
+    def __init__(self, native, options):
+        self._mode = options['mode']
+        target = target_grid(native, options)
+
+        if target.shape[0] < 2:
+            raise ValueError('Resampling needs at least two target points within the native '
+                             'range {}-{} cm-1, got {}'.format(native[0], native[-1], target.shape[0]))
+
+        if self._mode == 'sample':
+            right = np.clip(np.searchsorted(native, target), 1, native.shape[0] - 1)
+            left = right - 1
+            nearest = np.where(target - native[left] <= native[right] - target, left, right)
+            index = np.unique(nearest)
+
+        if self._mode == 'sample':
+            self._index = index
+            self._wavenumber_grid = native[index]
+            return
+
+        half = np.diff(target)/2
+        edges = np.concatenate(([target[0] - half[0]], target[:-1] + half, [target[-1] + half[-1]]))
+        starts = np.searchsorted(native, edges[:-1], side='left')
+        stops = np.searchsorted(native, edges[1:], side='left')
+        counts = stops - starts
+        keep = counts > 0
+        if not keep.any():
+            raise ValueError('No native wavenumber falls in any bin of the target grid '
+                             '{}-{} cm-1'.format(target[0], target[-1]))
+
+        self._starts = starts[keep]
+        self._counts = counts[keep]
+        self._nbins = self._starts.shape[0]
+        self._reduce_index = self._starts
+        if stops[keep][-1] < native.shape[0]:
+            self._reduce_index = np.append(self._starts, stops[keep][-1])
+        self._wavenumber_grid = target[keep]
+
+    @property
+    def wavenumberGrid(self):
+        return self._wavenumber_grid
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @property
+    def sampleIndex(self):
+        """Native indices kept in ``sample`` mode"""
+        return self._index
+
+    def __call__(self, spectrum):
+        """Resamples a spectrum given on the native grid"""
+        if self._mode == 'sample':
+            return spectrum[self._index]
+        return np.add.reduceat(spectrum, self._reduce_index)[:self._nbins]/self._counts
@@ -0,0 +1,112 @@
+"""
+Opt-in wall-time instrumentation of the forward model stages.
+
+Enabled by setting ``petitrad_timing`` in [Global] or with
+``Timings().enable()``, when disabled :func:`Timings.stage` returns a
+shared no-op context manager.
+"""
+import math
+import time
+from contextlib import contextmanager, nullcontext
+from taurex.cache.singleton import Singleton
+
+HISTOGRAM_MIN_EXPONENT = -6
+HISTOGRAM_BINS_PER_DECADE = 4
+HISTOGRAM_BINS = 8*HISTOGRAM_BINS_PER_DECADE
+
+_disabled = nullcontext()
+
+
+class StageStatistics:
+    """Count, total, extremes and log-spaced histogram of one stage"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = 0.0
+        self.histogram = [0]*(HISTOGRAM_BINS + 2)
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.minimum = min(self.minimum, elapsed)
+        self.maximum = max(self.maximum, elapsed)
+        if elapsed <= 0.0:
+            index = 0
+        else:
+            index = math.floor((math.log10(elapsed) - HISTOGRAM_MIN_EXPONENT)*HISTOGRAM_BINS_PER_DECADE) + 1
+            index = min(max(index, 0), HISTOGRAM_BINS + 1)
+        self.histogram[index] += 1
+
+    def to_dict(self):
+        return {'count': self.count,
+                'total': self.total,
+                'mean': self.total/self.count if self.count else 0.0,
+                'min': self.minimum if self.count else 0.0,
+                'max': self.maximum,
+                'histogram': list(self.histogram)}
+
+
+def histogram_edges():
+    """
+    Histogram bin edges in seconds, the first bin holds times below
+    the first edge (1 us) and the last one times above the last (100 s)
+    """
+    return [10**(HISTOGRAM_MIN_EXPONENT + x/HISTOGRAM_BINS_PER_DECADE)
+            for x in range(HISTOGRAM_BINS + 1)]
+
+
+class Timings(Singleton):
+    """
+    Process-wide wall-time statistics of named stages such as
+    ``setup_parameters`` or ``calc_transm``
+    """
+
+    def init(self):
+        self._stages = {}
+        self._enabled = False
+
+    def enable(self, value=True):
+        self._enabled = value
+
+    @property
+    def enabled(self):
+        from taurex.cache import GlobalCache
+        return self._enabled or bool(GlobalCache()['petitrad_timing'])
+
+    def stage(self, name):
+        """
+        Context manager timing the enclosed block as ``name``
+        """
+        if not self.enabled:
+            return _disabled
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, elapsed):
+        stats = self._stages.get(name)
+        if stats is None:
+            stats = self._stages[name] = StageStatistics()
+        stats.add(elapsed)
+
+    def stats(self):
+        """Statistics of every stage recorded so far"""
+        return {name: stats.to_dict() for name, stats in self._stages.items()}
+
+    def dump(self, filename):
+        """Writes :func:`stats` and the histogram edges to a JSON file"""
+        import json
+        with open(filename, 'w') as f:
+            json.dump({'histogram_edges': histogram_edges(),
+                       'stages': self.stats()}, f, indent=2)
+
+    def reset(self):
+        self._stages = {}
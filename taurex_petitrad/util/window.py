@@ -0,0 +1,85 @@
+import numpy as np
+
+
+def clip_range():
+    """
+    Wavenumber range (cm-1) requested through ``petitrad_wnclip`` or
+    ``petitrad_wlclip`` (um) in [Global], the latter taking priority.
+
+    Returns
+    -------
+    tuple or None
+        (min_wn, max_wn) or ``None`` if no clipping is requested
+    """
+    from taurex.cache import GlobalCache
+    wavenumber_range = GlobalCache()['petitrad_wnclip']
+    wavelength_range = GlobalCache()['petitrad_wlclip']
+
+    clip = None
+    if wavenumber_range is not None:
+        clip = (min(wavenumber_range), max(wavenumber_range))
+    if wavelength_range is not None:
+        wn = [10000/x for x in wavelength_range]
+        clip = (min(wn), max(wn))
+    return clip
+
+
+def wavenumber_window(file_wavenumber, clip=None):
+    """
+    Finds the contiguous index range of a monotonic wavenumber array
+    that lies within ``clip``.
+
+    Returns
+    -------
+    tuple
+        (start, stop) so that ``file_wavenumber[start:stop]`` is the window
+    """
+    if clip is None:
+        return 0, file_wavenumber.shape[0]
+    min_wn, max_wn = clip
+    window = np.flatnonzero((file_wavenumber >= min_wn) & (file_wavenumber <= max_wn))
+    if window.shape[0] == 0:
+        return 0, 0
+    return window[0], window[-1] + 1
+
+
+def storage_dtype():
+    """
+    Storage type for cross-section grids, float32 when ``petitrad_float32``
+    is set in [Global], float64 otherwise.
+    """
+    from taurex.cache import GlobalCache
+    if GlobalCache()['petitrad_float32']:
+        return np.float32
+    return np.float64
+
+
+def grid_ranges():
+    """
+    Pressure (Pa) and temperature (K) ranges requested through
+    ``petitrad_pressure_range`` and ``petitrad_temperature_range``
+    in [Global], ``None`` for each one that is not set.
+    """
+    from taurex.cache import GlobalCache
+    pressure_range = GlobalCache()['petitrad_pressure_range']
+    temperature_range = GlobalCache()['petitrad_temperature_range']
+    if pressure_range is not None:
+        pressure_range = (min(pressure_range), max(pressure_range))
+    if temperature_range is not None:
+        temperature_range = (min(temperature_range), max(temperature_range))
+    return pressure_range, temperature_range
+
+
+def bracket(grid, bounds):
+    """
+    Sub-grid of a sorted ``grid`` covering ``bounds`` plus the
+    grid point on either side so values at the bounds can still be
+    interpolated. At least two points are always kept.
+    """
+    if bounds is None or grid.shape[0] < 2:
+        return grid
+    low = np.searchsorted(grid, bounds[0], side='right') - 1
+    high = np.searchsorted(grid, bounds[1], side='left')
+    low = min(max(low, 0), grid.shape[0] - 2)
+    high = max(min(high, grid.shape[0] - 1), low + 1)
+    return grid[low:high+1]
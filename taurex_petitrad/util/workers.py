@@ -0,0 +1,55 @@
+import os
+
+
+def node_processes():
+    """Number of MPI processes sharing this node, 1 without MPI."""
+    try:
+        import mpi4py
+    except ImportError:
+        return 1
+    from taurex.mpi import shared_comm
+    comm = shared_comm()
+    if comm is None:
+        return 1
+    return comm.Get_size()
+
+
+def node_rank():
+    """Rank of this process among those sharing the node, 0 without MPI."""
+    try:
+        import mpi4py
+    except ImportError:
+        return 0
+    from taurex.mpi import shared_rank
+    return shared_rank()
+
+
+def load_workers():
+    """
+    Number of threads used to read opacity files, set through
+    ``petitrad_load_workers`` in [Global]. Defaults to the number
+    of cores (capped at 8) divided between the MPI processes
+    running on the node.
+    """
+    from taurex.cache import GlobalCache
+    workers = GlobalCache()['petitrad_load_workers']
+    if workers is None:
+        workers = min(8, os.cpu_count() or 1) // node_processes()
+    return max(1, int(workers))
+
+
+def run_threaded(func, items, workers):
+    """
+    Calls ``func`` on every item, on a thread pool when more than
+    one worker is requested. Exceptions are re-raised in the caller.
+    """
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        for item in items:
+            func(item)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        for _ in pool.map(func, items):
+            pass
@@ -0,0 +1,71 @@
+"""
+Shared fixtures. Opacities are generated with the synthetic writers of
+``benchmarks/`` and petitRADTRANS is replaced by the benchmark stand-in
+when it is not installed.
+"""
+import importlib.util
+import os
+import sys
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'benchmarks')
+
+sys.path.insert(0, BENCHMARKS)
+if importlib.util.find_spec('petitRADTRANS') is None:
+    sys.path.insert(0, os.path.join(BENCHMARKS, 'standin'))
+
+TEMPERATURES = (300.0, 600.0, 1000.0, 1500.0)
+PRESSURES = (1e-5, 1e-3, 1e-1, 1e1)
+
+
+@pytest.fixture(autouse=True)
+def global_cache():
+    """Restores the [Global] variables set by a test"""
+    from taurex.cache import GlobalCache
+    saved = dict(GlobalCache().variable_dict)
+    yield GlobalCache()
+    GlobalCache().variable_dict.clear()
+    GlobalCache().variable_dict.update(saved)
+
+
+@pytest.fixture(scope='session')
+def input_data(tmp_path_factory):
+    """Line-by-line and correlated-k folders of H2O, CO and CH4"""
+    from synthetic import make_input_data
+    return str(make_input_data(str(tmp_path_factory.mktemp('input_data')),
+                               lbl_wavenumbers=3000, ck_wavenumbers=300,
+                               temperatures=TEMPERATURES, pressures=PRESSURES))
+
+
+def molecule_folder(input_data, kind, molecule='H2O'):
+    return os.path.join(input_data, 'opacities', 'lines', kind, '{}_main_iso'.format(molecule))
+
+
+@pytest.fixture
+def make_model(input_data, global_cache):
+    """Builds a model of H2O and CO on the stand-in petitRADTRANS"""
+    from taurex.cache import OpacityCache
+    global_cache['xsec_path'] = input_data
+    global_cache['ktable_path'] = input_data
+    OpacityCache().force_active(['H2O', 'CO'])
+
+    def make(kind, **kwargs):
+        from taurex.data.profiles.chemistry import TaurexChemistry, ConstantGas
+        from taurex.data.profiles.temperature import Isothermal
+        from taurex.data import Planet
+        from taurex.data.stellar import BlackbodyStar
+        from taurex_petitrad.model.transmission import TransmissionRADTRANS
+        from taurex_petitrad.model.emission import EmissionRADTRANS
+        from taurex_petitrad.model.directimage import DirectImageRADTRANS
+        klass = {'transmission': TransmissionRADTRANS, 'emission': EmissionRADTRANS,
+                 'directimage': DirectImageRADTRANS}[kind]
+        chemistry = TaurexChemistry()
+        chemistry.addGas(ConstantGas('H2O', 1e-4))
+        chemistry.addGas(ConstantGas('CO', 1e-5))
+        model = klass(planet=Planet(), star=BlackbodyStar(), temperature_profile=Isothermal(1200.0),
+                      chemistry=chemistry, nlayers=30, **kwargs)
+        model.build()
+        return model
+
+    yield make
+    OpacityCache().force_active([])
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from taurex.binning import FluxBinner
+from taurex_petitrad.binning.sparsebinner import SparseFluxBinner
+
+OBSERVATIONS = [
+    (np.linspace(1000, 5000, 50), None),
+    (np.geomspace(400, 12000, 300), None),
+    (np.array([2000.0, 2100.0, 2105.0, 8000.0]), np.array([50.0, 300.0, 20.0, 100.0])),
+    (np.linspace(20000, 30000, 5), None),
+]
+
+
+@pytest.fixture
+def native():
+    return np.sort(np.random.default_rng(0).uniform(500, 10000, 20000))
+
+
+@pytest.mark.parametrize('wngrid,width', OBSERVATIONS)
+def test_matches_fluxbinner(native, wngrid, width):
+    rng = np.random.default_rng(1)
+    spectrum = rng.uniform(0, 1, native.shape)
+    error = rng.uniform(0, 0.1, native.shape)
+    expected = FluxBinner(wngrid, width).bindown(native, spectrum, error=error)
+    binned = SparseFluxBinner(wngrid, width).bindown(native, spectrum, error=error)
+    np.testing.assert_array_equal(binned[0], expected[0])
+    np.testing.assert_allclose(binned[1], expected[1], rtol=1e-12, atol=0)
+    np.testing.assert_allclose(binned[2], expected[2], rtol=1e-12, atol=0)
+
+
+@pytest.mark.parametrize('wngrid,width', OBSERVATIONS)
+def test_batch(native, wngrid, width):
+    spectra = np.random.default_rng(2).uniform(0, 1, (7, native.shape[0]))
+    binner = FluxBinner(wngrid, width)
+    binned = SparseFluxBinner(wngrid, width).bindown(native, spectra)[1]
+    assert binned.shape == (7, wngrid.shape[0])
+    for spectrum, row in zip(spectra, binned):
+        np.testing.assert_allclose(row, binner.bindown(native, spectrum)[1], rtol=1e-12, atol=0)
+
+
+def test_unsorted(native):
+    rng = np.random.default_rng(3)
+    wngrid = np.linspace(1000, 5000, 50)
+    spectrum = rng.uniform(0, 1, native.shape)
+    order = rng.permutation(native.shape[0])
+    binner = SparseFluxBinner(wngrid)
+    np.testing.assert_allclose(binner.bindown(native[order], spectrum[order])[1],
+                               FluxBinner(wngrid).bindown(native, spectrum)[1],
+                               rtol=1e-12, atol=0)
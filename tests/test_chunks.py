@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('kind,kwargs', [
+    ('transmission', dict(Pcloud=1e3, kappa_zero=0.1, gamma_scat=-2.0, haze_factor=3.0)),
+    ('directimage', {}),
+])
+@pytest.mark.parametrize('radtrans_cache', [None, 20])
+def test_matches_unchunked(make_model, global_cache, kind, kwargs, radtrans_cache):
+    global_cache['petitrad_radtrans_cache'] = radtrans_cache
+    full = make_model(kind, **kwargs)
+    global_cache['petitrad_chunk_points'] = 1000000
+    chunked = make_model(kind, **kwargs)
+
+    for wngrid in (None, np.linspace(1000, 5000, 100), np.linspace(3000, 3100, 10)):
+        for temperature in (1200.0, 900.0):
+            full['T'] = temperature
+            chunked['T'] = temperature
+            grid, spectrum, _, _ = chunked.model(wngrid)
+            expected_grid, expected, _, _ = full.model(wngrid)
+            np.testing.assert_array_equal(grid, expected_grid)
+            np.testing.assert_array_equal(spectrum, expected)
+    assert len(chunked.chunk_layout()) > 1
@@ -0,0 +1,30 @@
+import numpy as np
+
+WNGRID = np.linspace(1000, 5000, 100)
+
+
+def apply(model, name, value):
+    if name == 'star_temperature':
+        model.star.temperature = value
+    else:
+        model[name] = value
+
+
+def test_star_and_planet_changes(make_model):
+    model = make_model('emission')
+    initial = model.model(WNGRID)[1]
+    previous = initial
+    steps = [('star_temperature', 6000.0), ('planet_radius', 1.3), ('T', 900.0),
+             ('star_temperature', 5000.0), ('planet_radius', 1.0), ('T', 1200.0)]
+    for index, (name, value) in enumerate(steps):
+        apply(model, name, value)
+        current = model.model(WNGRID)[1]
+        assert not np.array_equal(current, previous), name
+
+        # A new model has no cached SED or stellar factor
+        reference = make_model('emission')
+        for step in steps[:index + 1]:
+            apply(reference, *step)
+        np.testing.assert_array_equal(current, reference.model(WNGRID)[1])
+        previous = current
+    np.testing.assert_array_equal(previous, initial)
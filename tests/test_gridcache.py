@@ -0,0 +1,87 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from conftest import molecule_folder
+
+
+def reader(kind):
+    if kind == 'line_by_line':
+        from taurex_petitrad.opacities.linebyline import LineByLine
+        return LineByLine, '_load_xsec_from_path'
+    from taurex_petitrad.opacities.ck import CKTable
+    return CKTable, '_load_xsec'
+
+
+@pytest.fixture(params=['line_by_line', 'corr_k'])
+def cached_reader(request, input_data, global_cache, tmp_path, monkeypatch):
+    """Reader class on a copy of a molecule folder, counting reads of the sigma files"""
+    kind = request.param
+    path = str(tmp_path / 'opacities' / kind / 'H2O_main_iso')
+    shutil.copytree(molecule_folder(input_data, kind), path)
+    global_cache['petitrad_cache_path'] = str(tmp_path / 'cache')
+
+    klass, load_name = reader(kind)
+    load = getattr(klass, load_name)
+    reads = []
+
+    def counted(self):
+        reads.append(self)
+        return load(self)
+
+    monkeypatch.setattr(klass, load_name, counted)
+    return klass, path, reads
+
+
+def test_round_trip(cached_reader):
+    klass, path, reads = cached_reader
+    first = klass(path)
+    second = klass(path)
+    assert len(reads) == 1
+    np.testing.assert_array_equal(second.pressureGrid, first.pressureGrid)
+    np.testing.assert_array_equal(second.temperatureGrid, first.temperatureGrid)
+    np.testing.assert_array_equal(second.wavenumberGrid, first.wavenumberGrid)
+    np.testing.assert_array_equal(second.xsecGrid, first.xsecGrid)
+    assert not isinstance(second.xsecGrid, np.memmap)
+
+
+def test_mmap(cached_reader, global_cache):
+    klass, path, reads = cached_reader
+    first = klass(path)
+    global_cache['petitrad_mmap'] = True
+    second = klass(path)
+    assert len(reads) == 1
+    assert isinstance(second.xsecGrid, np.memmap)
+    np.testing.assert_array_equal(second.xsecGrid, first.xsecGrid)
+
+
+def test_parameters_change_key(cached_reader, global_cache):
+    klass, path, reads = cached_reader
+    klass(path)
+    global_cache['petitrad_wnclip'] = [2000.0, 5000.0]
+    clipped = klass(path)
+    assert len(reads) == 2
+    assert clipped.wavenumberGrid.min() >= 2000.0
+
+
+def test_source_change_invalidates(cached_reader):
+    klass, path, reads = cached_reader
+    klass(path)
+    sigma = sorted(x for x in os.listdir(path) if x.startswith('sigma_'))[0]
+    stat = os.stat(os.path.join(path, sigma))
+    os.utime(os.path.join(path, sigma), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    klass(path)
+    assert len(reads) == 2
+    klass(path)
+    assert len(reads) == 2
+
+
+@pytest.mark.parametrize('valid', [True, False])
+def test_follows_first_process(cached_reader, monkeypatch, valid):
+    import taurex.mpi
+    klass, path, reads = cached_reader
+    klass(path)
+    monkeypatch.setattr(taurex.mpi, 'get_rank', lambda: 1)
+    monkeypatch.setattr(taurex.mpi, 'broadcast', lambda value: valid)
+    klass(path)
+    assert len(reads) == (1 if valid else 2)
@@ -0,0 +1,96 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from synthetic import make_linebyline_folder, sigma_name
+from conftest import TEMPERATURES, PRESSURES
+
+
+def make_folder(input_data, molecule):
+    return make_linebyline_folder(input_data, molecule, n_wavenumbers=100,
+                                  temperatures=TEMPERATURES[:2], pressures=PRESSURES[:2])
+
+
+@pytest.fixture
+def opacities(tmp_path, global_cache, monkeypatch):
+    """Fresh line-by-line folder of H2O and CO with an empty in-memory index"""
+    from taurex_petitrad.util import index
+    monkeypatch.setattr(index, '_indexes', {})
+    for molecule in ('H2O', 'CO'):
+        make_folder(str(tmp_path), molecule)
+    global_cache['xsec_path'] = str(tmp_path)
+    path = os.path.join(str(tmp_path), 'opacities', 'lines', 'line_by_line')
+    return path, os.path.join(path, index.INDEX_NAME)
+
+
+def discovered():
+    from taurex_petitrad.opacities.discovery import discover_linebyline
+    return sorted(molecule for molecule, _ in discover_linebyline())
+
+
+def test_index_reused(opacities, monkeypatch):
+    from taurex_petitrad.util import index
+    path, index_path = opacities
+    assert discovered() == ['CO', 'H2O']
+    stamp = os.stat(index_path).st_mtime_ns
+
+    assert discovered() == ['CO', 'H2O']
+    monkeypatch.setattr(index, '_indexes', {})
+    monkeypatch.setattr(index, 'scan_folder', None)
+    assert discovered() == ['CO', 'H2O']
+    assert os.stat(index_path).st_mtime_ns == stamp
+
+
+def test_molecule_added_and_removed(opacities, monkeypatch):
+    from taurex_petitrad.util import index
+    path, index_path = opacities
+    discovered()
+    os.utime(index_path, ns=(0, 0))
+
+    make_folder(os.path.dirname(os.path.dirname(os.path.dirname(path))), 'CH4')
+    assert discovered() == ['CH4', 'CO', 'H2O']
+    assert os.stat(index_path).st_mtime_ns != 0
+
+    os.utime(index_path, ns=(0, 0))
+    shutil.rmtree(os.path.join(path, 'CO_main_iso'))
+    monkeypatch.setattr(index, '_indexes', {})
+    assert discovered() == ['CH4', 'H2O']
+    assert os.stat(index_path).st_mtime_ns != 0
+    assert sorted(index._read_index(index_path)['folders']) == ['CH4_main_iso', 'H2O_main_iso']
+
+
+def test_folder_rescanned(opacities):
+    from taurex_petitrad.util.index import folder_entry
+    from taurex_petitrad.opacities.discovery import LINEBYLINE_BYTES_PER_POINT
+    path, index_path = opacities
+    discovered()
+    folder = os.path.join(path, 'H2O_main_iso')
+    assert len(folder_entry(folder, LINEBYLINE_BYTES_PER_POINT)['sigma_files']) == 4
+
+    name = sigma_name(TEMPERATURES[2], PRESSURES[0])
+    shutil.copy(os.path.join(folder, sigma_name(TEMPERATURES[0], PRESSURES[0])),
+                os.path.join(folder, name))
+    discovered()
+    entry = folder_entry(folder, LINEBYLINE_BYTES_PER_POINT)
+    assert len(entry['sigma_files']) == 5
+    assert name in [x[2] for x in entry['sigma_files']]
+
+
+def test_wavenumber_count_checked(tmp_path):
+    from synthetic import make_ktable_folder
+    from taurex_petitrad.opacities.linebyline import LineByLine
+    from taurex_petitrad.opacities.ck import CKTable
+    linebyline = make_folder(str(tmp_path), 'H2O')
+    wlen = np.fromfile(os.path.join(linebyline, 'wlen.dat'))
+    wlen[:-1].tofile(os.path.join(linebyline, 'wlen.dat'))
+    with pytest.raises(ValueError):
+        LineByLine(linebyline)
+
+    ktable = make_ktable_folder(str(tmp_path), 'H2O', 50, TEMPERATURES[:2], PRESSURES[:2])
+    kappa = os.path.join(ktable, 'kappa_g_info.dat')
+    with open(kappa) as f:
+        lines = f.readlines()
+    with open(kappa, 'w') as f:
+        f.writelines(lines[:-1])
+    with pytest.raises(ValueError):
+        CKTable(ktable)
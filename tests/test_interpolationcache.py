@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+WNGRID = np.linspace(1000, 5000, 100)
+
+
+def test_restores_temperature():
+    from petitRADTRANS import Radtrans
+    from taurex_petitrad.model.interpolationcache import InterpolationCache
+    atmosphere = Radtrans(line_species=['H2O', 'CO'])
+    atmosphere.setup_opa_structure(np.geomspace(1e-6, 1e2, 30))
+    cache = InterpolationCache.install(atmosphere)
+    assert InterpolationCache.install(atmosphere) is cache
+
+    temperature = np.full(30, 1200.0)
+    atmosphere.interpolate_species_opa(temperature)
+    expected = atmosphere.line_struc_kappas.copy()
+    atmosphere.interpolate_species_opa(np.full(30, 800.0))
+    atmosphere.interpolate_species_opa(np.full(30, 800.0))
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    atmosphere.temp = None
+    atmosphere.line_struc_kappas = np.zeros_like(expected)
+    atmosphere.interpolate_species_opa(np.full(30, 800.0))
+    assert cache.hits == 2
+    np.testing.assert_array_equal(atmosphere.temp, 800.0)
+
+
+@pytest.mark.parametrize('kind,kwargs,steps', [
+    ('transmission', dict(Pcloud=1e3, kappa_zero=0.1, gamma_scat=-2.0, haze_factor=3.0),
+     [('H2O', 1e-3), ('CO', 1e-6), ('clouds_pressure', 1e2), ('gamma_scat', -3.0), ('T', 900.0),
+      ('H2O', 1e-5)]),
+    ('emission', {}, [('H2O', 1e-3), ('CO', 1e-6), ('T', 900.0), ('H2O', 1e-5)]),
+])
+def test_matches_full_interpolation(make_model, global_cache, kind, kwargs, steps):
+    global_cache['petitrad_reuse_interpolation'] = True
+    reused = make_model(kind, **kwargs)
+    reused.model(WNGRID)
+    global_cache['petitrad_reuse_interpolation'] = False
+    full = make_model(kind, **kwargs)
+    full.model(WNGRID)
+
+    for name, value in steps:
+        reused[name] = value
+        full[name] = value
+        np.testing.assert_array_equal(reused.model(WNGRID)[1], full.model(WNGRID)[1])
+    # Every step but the temperature change reuses the interpolation
+    assert reused.atmosphere.interpolate_species_opa.hits == len(steps) - 1
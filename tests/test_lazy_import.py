@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+
+def run(code):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(x for x in (root, env.get('PYTHONPATH')) if x)
+    subprocess.run([sys.executable, '-c', code], check=True, env=env)
+
+
+def test_import_does_not_load_classes():
+    run('import sys\n'
+        'import taurex_petitrad\n'
+        'assert not any(m.startswith(("taurex_petitrad.model", "taurex_petitrad.opacities"))\n'
+        '               for m in sys.modules)\n'
+        'from taurex_petitrad.model.transmission import TransmissionRADTRANS\n'
+        'assert taurex_petitrad.TransmissionRADTRANS is TransmissionRADTRANS\n')
+
+
+def test_class_factory_registers_classes():
+    run('from taurex.parameter.classfactory import ClassFactory\n'
+        'import taurex_petitrad\n'
+        'ClassFactory().load_plugin(taurex_petitrad)\n'
+        'keywords = [k for c in ClassFactory().modelKlasses for k in c.input_keywords()]\n'
+        'assert "transmission-petitrad" in keywords\n'
+        'assert taurex_petitrad.CKTable in ClassFactory().opacityKlasses\n'
+        'assert taurex_petitrad.LineByLine in ClassFactory().opacityKlasses\n')
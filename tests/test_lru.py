@@ -0,0 +1,49 @@
+import pickle
+import threading
+from taurex_petitrad.util.lru import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_bound():
+    cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.put('a', 'x'*6)
+    cache.put('b', 'x'*6)
+    cache.put('c', 'x'*20)
+    assert list(cache._data) == ['b']
+    assert cache.stats()['bytes'] == 6
+
+
+def test_threads():
+    cache = LRUCache(max_entries=50)
+
+    def work(offset):
+        for index in range(5000):
+            key = (offset*7 + index) % 80
+            cache.put(key, index)
+            cache.get((key + 3) % 80)
+
+    threads = [threading.Thread(target=work, args=(offset, )) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(cache) == 50
+    assert set(cache._sizes) == set(cache._data)
+
+
+def test_pickle():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    restored = pickle.loads(pickle.dumps(cache))
+    restored.put('b', 2)
+    assert restored.get('a') == 1 and 'b' in restored
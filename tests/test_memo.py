@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+WNGRID = np.linspace(1000, 5000, 100)
+KWARGS = dict(Pcloud=1e3, kappa_zero=0.1, gamma_scat=-2.0, haze_factor=3.0)
+
+
+def spectrum(model, global_cache, memo=True):
+    global_cache['petitrad_memo_entries'] = 10 if memo else None
+    return model.model(WNGRID)[1]
+
+
+@pytest.mark.parametrize('name,value', [('clouds_pressure', 1e2), ('P0_radius', 1e3),
+                                        ('gamma_scat', -3.0), ('T', 900.0), ('H2O', 1e-3)])
+def test_hit_and_miss(make_model, global_cache, name, value):
+    model = make_model('transmission', **KWARGS)
+    reference = make_model('transmission', **KWARGS)
+    original = model[name]
+    before = spectrum(model, global_cache)
+    assert model.memo_stats()['misses'] == 1
+
+    model[name] = value
+    reference[name] = value
+    changed = spectrum(model, global_cache)
+    assert model.memo_stats()['misses'] == 2
+    assert not np.array_equal(changed, before)
+    np.testing.assert_array_equal(changed, spectrum(reference, global_cache, memo=False))
+
+    model[name] = original
+    again = spectrum(model, global_cache)
+    stats = model.memo_stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 2)
+    np.testing.assert_array_equal(again, before)
+
+
+def test_disabled(make_model, global_cache):
+    model = make_model('transmission', **KWARGS)
+    first = spectrum(model, global_cache, memo=False)
+    np.testing.assert_array_equal(spectrum(model, global_cache, memo=False), first)
+    assert model.memo_stats()['entries'] == 0
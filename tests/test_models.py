@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+WNGRID = np.linspace(1000, 5000, 100)
+
+
+def test_nearest_layer(make_model):
+    model = make_model('transmission')
+    model.initialize_profiles()
+    profile = model.pressureProfile
+    log_midpoints = np.sqrt(profile[1:]*profile[:-1])
+    midpoints = 0.5*(profile[1:] + profile[:-1])
+    pressures = np.concatenate([profile, midpoints, log_midpoints,
+                                np.geomspace(profile[-1]/10, profile[0]*10, 200)])
+    for pressure in pressures:
+        assert model.nearest_layer(pressure) == np.argmin(np.abs(profile - pressure)), pressure
+
+
+@pytest.mark.parametrize('kind,kwargs,names,columns', [
+    ('transmission', dict(Pcloud=1e3, kappa_zero=0.1, gamma_scat=-2.0, haze_factor=3.0),
+     ['planet_radius', 'T', 'H2O', 'gamma_scat', 'clouds_pressure', 'planet_mass', 'P0_radius'],
+     [(0.8, 1.5), (800, 2000), (-6, -2), (-4, 0), (1, 4), (0.5, 2.0), (1, 5)]),
+    ('emission', {}, ['planet_radius', 'T', 'H2O'], [(0.8, 1.5), (800, 2000), (-6, -2)]),
+    ('directimage', {}, ['planet_radius', 'T', 'H2O'], [(0.8, 1.5), (800, 2000), (-6, -2)]),
+])
+def test_model_batch(make_model, kind, kwargs, names, columns):
+    from taurex_petitrad.binning.sparsebinner import SparseFluxBinner
+    model = make_model(kind, **kwargs)
+    rng = np.random.default_rng(1)
+    params = np.column_stack([rng.uniform(*bounds, 5) for bounds in columns])
+    # Abundances and pressures are drawn in log10
+    for index, name in enumerate(names):
+        if name in ('H2O', 'clouds_pressure', 'P0_radius'):
+            params[:, index] = 10**params[:, index]
+
+    original = [model[name] for name in names]
+    native, spectra = model.model_batch(params, names, WNGRID)
+    assert [model[name] for name in names] == original
+
+    binner = SparseFluxBinner(WNGRID)
+    binned = model.model_batch(params, names, WNGRID, binner=binner)[1]
+
+    for row, spectrum, binned_spectrum in zip(params, spectra, binned):
+        for name, value in zip(names, row):
+            model[name] = value
+        grid, expected, _, _ = model.model(WNGRID)
+        np.testing.assert_array_equal(native, grid)
+        np.testing.assert_array_equal(spectrum, expected)
+        np.testing.assert_allclose(binned_spectrum, binner.bindown(grid, expected)[1], rtol=1e-12)
+
+
+def test_model_batch_empty(make_model):
+    model = make_model('transmission')
+    native, spectra = model.model_batch(np.empty((0, 3)), ['planet_radius', 'T', 'H2O'], WNGRID)
+    assert native is None
+    assert spectra.shape[0] == 0
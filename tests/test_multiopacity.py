@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from conftest import molecule_folder
+
+# Inside the grid, on grid points, clamped at the top of one or both
+# axes and outside of the grid below one or both axes
+TEMPERATURES = np.array([450.0, 600.0, 999.9, 1500.0, 2000.0, 2000.0, 800.0, 250.0, 250.0, 1800.0, 250.0])
+PRESSURES = np.array([1e-2, 1e-3, 1e0, 1e1, 1e3, 1e-2, 1e3, 1e-2, 1e-9, 1e-9, 1e3])*1e5
+
+
+def load(input_data, kind, interpolation_mode):
+    from taurex_petitrad.opacities.linebyline import LineByLine
+    from taurex_petitrad.opacities.ck import CKTable
+    klass = LineByLine if kind == 'line_by_line' else CKTable
+    return [klass(molecule_folder(input_data, kind, molecule), interpolation_mode)
+            for molecule in ('H2O', 'CO', 'CH4')]
+
+
+@pytest.mark.parametrize('kind', ['line_by_line', 'corr_k'])
+@pytest.mark.parametrize('interpolation_mode', ['linear', 'exp'])
+@pytest.mark.parametrize('wngrid', [None, slice(10, 200), np.arange(5, 250, 7)])
+def test_matches_compute_opacity(input_data, kind, interpolation_mode, wngrid):
+    from taurex_petitrad.opacities.multiopacity import MultiOpacity
+
+    opacities = load(input_data, kind, interpolation_mode)
+    result = MultiOpacity(opacities).compute_opacities(TEMPERATURES, PRESSURES, wngrid)
+
+    assert result.shape[:2] == (len(opacities), TEMPERATURES.shape[0])
+    for molecule, opacity in enumerate(opacities):
+        for layer, (temperature, pressure) in enumerate(zip(TEMPERATURES, PRESSURES)):
+            # compute_opacity flattens the g-points and keeps the axis added by a None filter
+            expected = np.ravel(opacity.compute_opacity(temperature, pressure, wngrid))
+            np.testing.assert_allclose(result[molecule, layer].ravel(), expected, rtol=1e-7, atol=0)
+
+
+def test_shapes(input_data):
+    from taurex_petitrad.opacities.multiopacity import MultiOpacity
+
+    lbl = MultiOpacity(load(input_data, 'line_by_line', 'linear'))
+    ck = MultiOpacity(load(input_data, 'corr_k', 'linear'))
+    nlbl = lbl.wavenumberGrid.shape[0]
+    nck = ck.wavenumberGrid.shape[0]
+
+    assert lbl.compute_opacities(TEMPERATURES, PRESSURES).shape == (3, TEMPERATURES.shape[0], nlbl)
+    assert ck.compute_opacities(TEMPERATURES, PRESSURES).shape == (3, TEMPERATURES.shape[0], nck, 16)
+    mask = np.zeros(nck, dtype=bool)
+    mask[::3] = True
+    assert ck.compute_opacities(TEMPERATURES, PRESSURES, mask).shape == \
+        (3, TEMPERATURES.shape[0], mask.sum(), 16)
+
+
+def test_below_grid_is_zero(input_data):
+    from taurex_petitrad.opacities.multiopacity import MultiOpacity
+
+    result = MultiOpacity(load(input_data, 'corr_k', 'exp')).compute_opacities(
+        np.array([100.0]), np.array([1e-4]))
+    assert np.all(result == 0.0)
+
+
+def test_different_grids_rejected(input_data):
+    from taurex_petitrad.opacities.multiopacity import MultiOpacity
+
+    with pytest.raises(ValueError):
+        MultiOpacity(load(input_data, 'line_by_line', 'linear')[:1] + load(input_data, 'corr_k', 'linear')[:1])
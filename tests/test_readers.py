@@ -0,0 +1,119 @@
+"""
+Compares the windowed readers with straightforward loaders written
+the way the readers originally read the petitRADTRANS files.
+"""
+import glob
+import os
+import pathlib
+import numpy as np
+import pytest
+from taurex.util.util import calculate_weight
+from conftest import molecule_folder
+
+
+def sigma_files(path):
+    files = sorted(glob.glob(os.path.join(path, 'sigma_*.dat')))
+    temperature = [float(pathlib.Path(x).stem.split('_')[2][:-1]) for x in files]
+    pressure = [float(pathlib.Path(x).stem.split('_')[3].split('b')[0])*1e5 for x in files]
+    return files, pressure, temperature
+
+
+def molecules_per_gram(path):
+    return 1/calculate_weight(pathlib.Path(path).stem.split('_')[0])*6.0221409e23
+
+
+def legacy_linebyline(path):
+    files, pressure, temperature = sigma_files(path)
+    pressure_grid = np.unique(pressure)
+    temperature_grid = np.unique(temperature)
+    wngrid = 10000/(np.fromfile(os.path.join(path, 'wlen.dat'))[::-1]*1e4)
+    xsec = np.empty((len(pressure_grid), len(temperature_grid), len(wngrid)))
+    for p, t, sigma in zip(pressure, temperature, files):
+        xsec[np.searchsorted(pressure_grid, p), np.searchsorted(temperature_grid, t)] = \
+            np.fromfile(sigma)[::-1]/molecules_per_gram(path)
+    return pressure_grid, temperature_grid, wngrid, xsec
+
+
+def legacy_ktable(path):
+    from taurex.constants import SPDLIGT
+    files, pressure, temperature = sigma_files(path)
+    pressure_grid = np.unique(pressure)
+    temperature_grid = np.unique(temperature)
+    frequency = np.loadtxt(os.path.join(path, 'kappa_g_info.dat'), skiprows=1)[:, 0]
+    wngrid = 10000/((SPDLIGT/frequency[::-1])*1e6)
+    xsec = np.empty((len(pressure_grid), len(temperature_grid), len(wngrid), 16))
+    for p, t, sigma in zip(pressure, temperature, files):
+        raw = np.fromfile(sigma, dtype=np.int32)
+        values = np.empty(len(raw[1::4])*2, dtype=np.int32)
+        values[0::2] = raw[1::4]
+        values[1::2] = raw[2::4]
+        xsec[np.searchsorted(pressure_grid, p), np.searchsorted(temperature_grid, t)] = \
+            values.view(np.float64).reshape(-1, 16)[::-1]/molecules_per_gram(path)
+    return pressure_grid, temperature_grid, wngrid, xsec
+
+
+def load(kind, path):
+    if kind == 'line_by_line':
+        from taurex_petitrad.opacities.linebyline import LineByLine
+        return LineByLine(path)
+    from taurex_petitrad.opacities.ck import CKTable
+    return CKTable(path)
+
+
+LEGACY = {'line_by_line': legacy_linebyline, 'corr_k': legacy_ktable}
+
+
+def check(opacity, expected, wavenumbers=None, pressures=None, temperatures=None):
+    pressure_grid, temperature_grid, wngrid, xsec = expected
+    wn_mask = np.ones(wngrid.shape, dtype=bool)
+    if wavenumbers is not None:
+        wn_mask = (wngrid >= min(wavenumbers)) & (wngrid <= max(wavenumbers))
+    p_mask = np.ones(pressure_grid.shape, dtype=bool) if pressures is None \
+        else np.isin(pressure_grid, pressures)
+    t_mask = np.ones(temperature_grid.shape, dtype=bool) if temperatures is None \
+        else np.isin(temperature_grid, temperatures)
+
+    np.testing.assert_array_equal(opacity.pressureGrid, pressure_grid[p_mask])
+    np.testing.assert_array_equal(opacity.temperatureGrid, temperature_grid[t_mask])
+    np.testing.assert_allclose(opacity.wavenumberGrid, wngrid[wn_mask], rtol=1e-14)
+    np.testing.assert_allclose(opacity.xsecGrid,
+                               xsec[p_mask][:, t_mask][:, :, wn_mask], rtol=1e-14)
+
+
+@pytest.mark.parametrize('kind', ['line_by_line', 'corr_k'])
+def test_full_grid(input_data, kind):
+    path = molecule_folder(input_data, kind)
+    check(load(kind, path), LEGACY[kind](path))
+
+
+@pytest.mark.parametrize('kind', ['line_by_line', 'corr_k'])
+def test_wavenumber_clip(input_data, global_cache, kind):
+    path = molecule_folder(input_data, kind)
+    global_cache['petitrad_wnclip'] = [5000.0, 2000.0]
+    check(load(kind, path), LEGACY[kind](path), wavenumbers=(2000.0, 5000.0))
+
+
+@pytest.mark.parametrize('kind', ['line_by_line', 'corr_k'])
+def test_wavelength_clip(input_data, global_cache, kind):
+    path = molecule_folder(input_data, kind)
+    global_cache['petitrad_wnclip'] = [100.0, 200.0]
+    global_cache['petitrad_wlclip'] = [1.5, 4.0]
+    check(load(kind, path), LEGACY[kind](path), wavenumbers=(10000/4.0, 10000/1.5))
+
+
+@pytest.mark.parametrize('kind', ['line_by_line', 'corr_k'])
+def test_grid_ranges(input_data, global_cache, kind):
+    path = molecule_folder(input_data, kind)
+    global_cache['petitrad_pressure_range'] = [50.0, 5000.0]
+    global_cache['petitrad_temperature_range'] = [700.0, 900.0]
+    check(load(kind, path), LEGACY[kind](path),
+          pressures=(1.0, 100.0, 1e4), temperatures=(600.0, 1000.0))
+
+
+@pytest.mark.parametrize('kind', ['line_by_line', 'corr_k'])
+def test_float32(input_data, global_cache, kind):
+    path = molecule_folder(input_data, kind)
+    global_cache['petitrad_float32'] = True
+    opacity = load(kind, path)
+    assert opacity.xsecGrid.dtype == np.float32
+    np.testing.assert_allclose(opacity.xsecGrid, LEGACY[kind](path)[3], rtol=1e-6)
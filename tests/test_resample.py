@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from taurex_petitrad.util.resample import Resampler, resample_options
+from conftest import molecule_folder
+
+NATIVE = np.linspace(1000.0, 2000.0, 1001)
+
+
+def options(mode='sample', resolution=None, wngrid=None):
+    return {'mode': mode, 'resolution': resolution, 'wngrid': wngrid}
+
+
+def test_sample_nearest():
+    target = [1000.04, 1500.26, 1700.5, 2500.0]
+    resampler = Resampler(NATIVE, options(wngrid=target))
+    np.testing.assert_array_equal(resampler.wavenumberGrid, [1000.0, 1500.0, 1700.0])
+    spectrum = np.arange(NATIVE.shape[0], dtype=np.float64)
+    np.testing.assert_array_equal(resampler(spectrum), [0.0, 500.0, 700.0])
+
+
+def test_sample_resolution():
+    resampler = Resampler(NATIVE, options(resolution=100.0))
+    grid = resampler.wavenumberGrid
+    assert np.all(np.diff(grid) > 0)
+    assert grid[0] == NATIVE[0]
+    np.testing.assert_allclose(np.diff(np.log(grid)), 1/100, rtol=0.1)
+
+
+def test_bin_average():
+    target = [1100.0, 1200.0, 1300.0]
+    resampler = Resampler(NATIVE, options('bin', wngrid=target))
+    spectrum = np.random.default_rng(0).uniform(0, 1, NATIVE.shape)
+    edges = [1050.0, 1150.0, 1250.0, 1350.0]
+    expected = [spectrum[(NATIVE >= low) & (NATIVE < high)].mean()
+                for low, high in zip(edges[:-1], edges[1:])]
+    np.testing.assert_array_equal(resampler.wavenumberGrid, target)
+    np.testing.assert_allclose(resampler(spectrum), expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize('mode', ['sample', 'bin'])
+def test_too_few_points(mode):
+    with pytest.raises(ValueError):
+        Resampler(NATIVE, options(mode, wngrid=[1500.0, 3000.0]))
+
+
+def test_empty_bins():
+    with pytest.raises(ValueError):
+        Resampler(NATIVE, options('bin', wngrid=[1000.05, 1000.06]))
+
+
+def test_unknown_mode(global_cache):
+    global_cache['petitrad_resolution'] = 1000
+    global_cache['petitrad_resample_mode'] = 'spline'
+    with pytest.raises(ValueError):
+        resample_options()
+
+
+def test_cache_key(input_data, global_cache, tmp_path, monkeypatch):
+    from taurex_petitrad.opacities.linebyline import LineByLine
+    path = molecule_folder(input_data, 'line_by_line')
+    native = LineByLine(path)
+
+    global_cache['petitrad_cache_path'] = str(tmp_path)
+    load = LineByLine._load_xsec_from_path
+    reads = []
+
+    def counted(self):
+        reads.append(self)
+        return load(self)
+
+    monkeypatch.setattr(LineByLine, '_load_xsec_from_path', counted)
+    grids = {}
+    for mode, resolution in [('sample', 100), ('sample', 100), ('bin', 100), ('sample', 50)]:
+        global_cache['petitrad_resolution'] = resolution
+        global_cache['petitrad_resample_mode'] = mode
+        opacity = LineByLine(path)
+        resampler = Resampler(native.wavenumberGrid, resample_options())
+        np.testing.assert_array_equal(opacity.wavenumberGrid, resampler.wavenumberGrid)
+        np.testing.assert_allclose(opacity.xsecGrid[1, 2], resampler(native.xsecGrid[1, 2]),
+                                   rtol=1e-12)
+        grids[mode, resolution] = opacity.wavenumberGrid
+    assert len(reads) == 3
+    assert grids['sample', 100].shape != grids['sample', 50].shape
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def two_processes(global_cache, monkeypatch):
+    """Rank 0 of two processes holding the same points, counting the gathers"""
+    import taurex.mpi
+    gathers = []
+
+    def allgather(value):
+        gathers.append(value)
+        return [value, value]
+
+    global_cache['petitrad_spectral_mpi'] = True
+    monkeypatch.setattr(taurex.mpi, 'nprocs', lambda: 2)
+    monkeypatch.setattr(taurex.mpi, 'get_rank', lambda: 0)
+    monkeypatch.setattr(taurex.mpi, 'allgather', allgather)
+    return gathers
+
+
+def test_layout_gathered_on_build(make_model, two_processes):
+    model = make_model('transmission')
+    assert len(two_processes) == 1
+    native = model.nativeWavenumberGrid
+    assert native.shape[0] == 2*two_processes[0].shape[0]
+
+    model.initialize_profiles()
+    model.model(np.linspace(1000, 5000, 100))
+    assert model.nativeWavenumberGrid is native
+    # The layout once, then the spectrum
+    assert len(two_processes) == 2
+